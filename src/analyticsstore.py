@@ -0,0 +1,226 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+import pandas as pd
+from datacache import file_digest
+
+# SQLite store for the loaded sources, so the loaded data can be queried with SQL instead of
+# re-reading and re-merging the Excel files. Every row carries the workbook it came from
+# (source), and a load replaces all rows of its source: keys that disappear from a workbook
+# are deleted, and re-opening an older version of a file stores that version again. Other
+# workbooks' rows are left alone. Rows of one load that share a primary key are combined
+# first (numbers summed, MEAN_COLUMNS averaged, text from the first row), so e.g. several
+# traffic rows for an item and month are stored as their total.
+# The monthly_* tables are append-only partitions per export source, see monthlyingest.py.
+ANALYTICS_DB = os.environ.get('ANALYTICS_DB', 'mydb.db')
+
+# table -> (columns with SQL types, primary key columns, extra indexed columns)
+TABLES = {
+    # content digest of the workbook version currently stored for each (table, source)
+    'loaded_sources': (
+        [('table_name', 'TEXT'), ('source', 'TEXT'), ('source_sha1', 'TEXT'), ('loaded_at', 'TEXT')],
+        ['table_name', 'source'],
+        [],
+    ),
+    'product_counts': (
+        [('source', 'TEXT'), ('product_id', 'TEXT'), ('count', 'INTEGER')],
+        ['source', 'product_id'],
+        ['count'],
+    ),
+    'traffic': (
+        [('source', 'TEXT'), ('item_name', 'TEXT'), ('mon_year', 'TEXT'), ('items_viewed', 'REAL'),
+         ('items_added_to_cart', 'REAL'), ('items_purchased', 'REAL'),
+         ('total_purchasers', 'REAL'), ('item_revenue', 'REAL')],
+        ['source', 'item_name', 'mon_year'],
+        ['item_name', 'mon_year'],
+    ),
+    'seo_pages': (
+        [('source', 'TEXT'), ('page', 'TEXT'), ('mon_year', 'TEXT'), ('clicks', 'REAL'),
+         ('impressions', 'REAL'), ('ctr', 'REAL'), ('position', 'REAL')],
+        ['source', 'page', 'mon_year'],
+        ['page', 'mon_year'],
+    ),
+    'seo_queries': (
+        [('source', 'TEXT'), ('top_queries', 'TEXT'), ('mon_year', 'TEXT'), ('clicks', 'REAL'),
+         ('impressions', 'REAL'), ('ctr', 'REAL'), ('position', 'REAL')],
+        ['source', 'top_queries', 'mon_year'],
+        ['top_queries', 'mon_year'],
+    ),
+    'monthly_traffic': (
+        [('source', 'TEXT'), ('mon_year', 'TEXT'), ('rows', 'INTEGER'), ('items_added_to_cart', 'REAL'),
+         ('items_purchased', 'REAL'), ('item_revenue', 'REAL')],
+        ['source', 'mon_year'],
+        ['mon_year'],
+    ),
+    'monthly_seo_queries': (
+        [('source', 'TEXT'), ('mon_year', 'TEXT'), ('rows', 'INTEGER'), ('clicks', 'REAL'), ('impressions', 'REAL')],
+        ['source', 'mon_year'],
+        ['mon_year'],
+    ),
+    'items_catalog': (
+        [('source', 'TEXT'), ('item_number', 'TEXT'), ('item_product_group', 'TEXT'), ('item_description', 'TEXT')],
+        ['source', 'item_number'],
+        ['item_number', 'item_product_group'],
+    ),
+}
+
+# ratios that are averaged rather than summed when rows of one load share a key, the same
+# row-level means the SEO dashboard shows
+MEAN_COLUMNS = {
+    'seo_pages': ['ctr', 'position'],
+    'seo_queries': ['ctr', 'position'],
+}
+
+
+def normalize_column_names(columns):
+    return columns.str.strip().str.lower().str.replace(' ', '_').str.replace('-', '_')
+
+
+class AnalyticsStore:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or ANALYTICS_DB
+        self.conn = sqlite3.connect(self.db_path)
+        self.create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def create_tables(self):
+        with self.conn:
+            for table, (columns, primary_key, indexed) in TABLES.items():
+                self.conn.execute(self.table_sql(table).replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+                self.migrate_table(table)
+                for column in indexed:
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column})")
+
+    def table_sql(self, table, name=None):
+        columns, primary_key, _ = TABLES[table]
+        column_sql = ', '.join(f"{column} {sql_type}" for column, sql_type in columns)
+        return f"CREATE TABLE {name or table} ({column_sql}, PRIMARY KEY ({', '.join(primary_key)}))"
+
+    def migrate_table(self, table):
+        # a table created before columns were added to TABLES is rebuilt with them. Stored rows keep
+        # their values, new key columns get '' (e.g. rows stored before there was a source). Rows
+        # that collide on the new key are dropped, e.g. old loaded_sources digests
+        columns, primary_key, _ = TABLES[table]
+        existing = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        if all(name in existing for name, _ in columns):
+            return
+        select = ', '.join(
+            name if name in existing else ("''" if name in primary_key else "NULL") for name, _ in columns
+        )
+        self.conn.execute(self.table_sql(table, f"{table}_migrated"))
+        self.conn.execute(f"INSERT OR IGNORE INTO {table}_migrated SELECT {select} FROM {table}")
+        self.conn.execute(f"DROP TABLE {table}")
+        self.conn.execute(f"ALTER TABLE {table}_migrated RENAME TO {table}")
+
+    @contextmanager
+    def immediate(self):
+        # BEGIN IMMEDIATE takes the write lock before the first read, so a check-then-insert
+        # cannot interleave with another process doing the same. Commits on success
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def prepare_rows(self, table, df, source=None):
+        columns = [name for name, _ in TABLES[table][0]]
+        frame = df.copy()
+        frame.columns = normalize_column_names(frame.columns.astype(str))
+        frame = frame.loc[:, ~frame.columns.duplicated()].reindex(columns=columns)
+        if source is not None:
+            frame['source'] = source
+
+        if 'mon_year' in frame and pd.api.types.is_datetime64_any_dtype(frame['mon_year']):
+            frame['mon_year'] = frame['mon_year'].dt.strftime('%Y-%m-%d')
+        for name, sql_type in TABLES[table][0]:
+            if sql_type == 'TEXT':
+                frame[name] = frame[name].map(lambda value: None if pd.isna(value) else str(value))
+
+        primary_key = TABLES[table][1]
+        frame = frame.dropna(subset=primary_key)
+        if frame.duplicated(subset=primary_key).any():
+            means = MEAN_COLUMNS.get(table, [])
+            combine = {
+                name: 'first' if sql_type == 'TEXT' else 'mean' if name in means else lambda values: values.sum(min_count=1)
+                for name, sql_type in TABLES[table][0] if name not in primary_key
+            }
+            frame = frame.groupby(primary_key, sort=False, observed=True).agg(combine).reset_index()[columns]
+        frame = frame.astype(object).where(frame.notna(), None)
+        return columns, list(frame.itertuples(index=False, name=None))
+
+    def write_rows(self, table, df, update=True, source=None):
+        # runs in the caller's transaction. update=False keeps the stored row on a key conflict
+        columns, rows = self.prepare_rows(table, df, source)
+        primary_key = TABLES[table][1]
+        updates = ', '.join(f"{name} = excluded.{name}" for name in columns if name not in primary_key)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(primary_key)}) "
+            + (f"DO UPDATE SET {updates}" if update else "DO NOTHING")
+        )
+        self.conn.executemany(sql, rows)
+        return len(rows)
+
+    def upsert(self, table, df, replace=False, source=''):
+        # later rows win on a primary key conflict, replace=True clears the table first
+        with self.conn:
+            if replace:
+                self.conn.execute(f"DELETE FROM {table}")
+            return self.write_rows(table, df, source=source)
+
+    def replace_source(self, table, df, source, source_sha1=None):
+        # the rows of one source become exactly df, in one write transaction. with source_sha1,
+        # a source whose stored version has that digest is left as it is (returns 0)
+        with self.immediate():
+            if source_sha1 is not None and self.stored_version(table, source) == source_sha1:
+                return 0
+            self.conn.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+            saved = self.write_rows(table, df, source=source)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO loaded_sources (table_name, source, source_sha1, loaded_at) "
+                "VALUES (?, ?, ?, CURRENT_TIMESTAMP)", (table, source, source_sha1)
+            )
+            return saved
+
+    def stored_version(self, table, source):
+        row = self.conn.execute(
+            "SELECT source_sha1 FROM loaded_sources WHERE table_name = ? AND source = ?", (table, source)
+        ).fetchone()
+        return row[0] if row else None
+
+    def row_count(self, table):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def load_table(self, table):
+        return self.query(f"SELECT * FROM {table}")
+
+
+def source_name(source_path):
+    return os.path.abspath(source_path)
+
+
+def save_to_store(table, df, replace=False, source_path=None, db_path=None):
+    # store writes never block an analysis, failures are only reported.
+    # with source_path, the rows stored for that workbook are replaced by df, unless the stored
+    # version has the same content. without it, rows are upserted (replace=True clears the table)
+    try:
+        with AnalyticsStore(db_path) as store:
+            if source_path:
+                return store.replace_source(table, df, source_name(source_path), file_digest(source_path))
+            return store.upsert(table, df, replace=replace)
+    except (sqlite3.Error, OSError, KeyError, ValueError) as e:
+        print(f"Could not save {table} to analytics store: {e}")
+        return 0
@@ -0,0 +1,205 @@
+import argparse
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+
+from instrumentation import flush
+
+# Headless batch runner: runs the analyses without Tkinter and writes every figure to files.
+#   python batch.py --out reports seo exports/seo_*.xlsx
+#   python batch.py --out reports --format png,svg traffic exports/traffic_*.xlsx
+#   python batch.py --out reports leads --items items_catalog.xlsx exports/leads_*.xlsx
+#   python batch.py --out reports correlation --seo-queries q.xlsx --traffic t.xlsx --leads l.xlsx [--llm stub]
+# Each workbook is one job, and jobs run in parallel in a process pool (--jobs). Outputs are
+# named after the workbook, prefixed with its directory when two workbooks share a name.
+
+CORRELATION_SOURCES = [
+    ('seo_queries', "SEO Queries"),
+    ('traffic', "Traffic Data"),
+    ('leads', "Leads Data"),
+    ('seo_pages', "SEO Pages"),
+    ('items_catalog', "Items Catalog"),
+]
+
+
+def output_paths(out_dir, name, formats):
+    return [os.path.join(out_dir, f"{name}.{fmt}") for fmt in formats]
+
+
+def file_stem(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def output_names(files):
+    # {path: output name}. east/queries.xlsx and west/queries.xlsx become east_queries and
+    # west_queries instead of both writing queries_*; the same workbook twice is one job
+    paths = list(dict.fromkeys(os.path.abspath(path) for path in files))
+    stems = [file_stem(path) for path in paths]
+    names = {
+        path: f"{os.path.basename(os.path.dirname(path))}_{stem}" if stems.count(stem) > 1 else stem
+        for path, stem in zip(paths, stems)
+    }
+    clashes = sorted({name for name in names.values() if list(names.values()).count(name) > 1})
+    if clashes:
+        raise ValueError(f"Workbooks would write the same outputs: {', '.join(clashes)}")
+    return names
+
+
+def run_seo(file_path, out_dir, formats, incremental=False, name=None):
+    from seoqueriesanalysis import load_queries, run_all_analyses, show_monthly_trends
+
+    stem = name or file_stem(file_path)
+    if incremental:
+        outputs = output_paths(out_dir, f"{stem}_seo_monthly_trends", formats)
+        show_monthly_trends(file_path, output=outputs)
+        return outputs
+    outputs = output_paths(out_dir, f"{stem}_seo_analysis", formats)
+    run_all_analyses(load_queries(file_path), output=outputs)
+    return outputs
+
+
+def run_traffic(file_path, out_dir, formats, incremental=False, name=None):
+    from trafficanalysis import load_data, perform_analysis, show_monthly_trends
+
+    stem = name or file_stem(file_path)
+    if incremental:
+        outputs = output_paths(out_dir, f"{stem}_traffic_monthly_trends", formats)
+        show_monthly_trends(file_path, output=outputs)
+        return outputs
+    data = load_data(file_path)
+    if data is None:
+        raise ValueError(f"Could not load traffic data from {file_path}")
+    outputs = output_paths(out_dir, f"{stem}_traffic_analysis", formats)
+    perform_analysis(data, output=outputs)
+    return outputs
+
+
+def run_leads(file_path, items_path, out_dir, formats, name=None):
+    from leadanalysis import compute_product_counts, plot_top_products
+
+    stem = name or file_stem(file_path)
+    cleaned_product_counts = compute_product_counts(file_path, items_path)
+    csv_path = os.path.join(out_dir, f"{stem}_product_counts.csv")
+    cleaned_product_counts.to_csv(csv_path, index=False)
+    outputs = output_paths(out_dir, f"{stem}_top_products", formats)
+    plot_top_products(cleaned_product_counts, output=outputs)
+    return [csv_path] + outputs
+
+
+def run_correlation(source_paths, out_dir, formats, llm_backend=None):
+    from data_correlation import AdvancedDataAnalyzer
+    from datacache import read_excel_cached
+    from llmclient import make_backend
+
+    analyzer = AdvancedDataAnalyzer()
+    for source_name, file_path in source_paths.items():
+        analyzer.data_sources[source_name] = analyzer.profile_source(source_name, read_excel_cached(file_path))
+
+    processed_sources, correlation_data = analyzer.prepare_correlations()
+    summary_path = os.path.join(out_dir, "correlation_matches.csv")
+    analyzer.cross_source_join.summary().to_csv(summary_path, index=False)
+    outputs = output_paths(out_dir, "correlation_entries", formats)
+    analyzer.visualize_data_correlation(correlation_data, output=outputs)
+    pca_patterns = output_paths(out_dir, "correlation_pca_{source}", formats)
+    r2_table = analyzer.perform_pca_and_regression(processed_sources, output_pattern=pca_patterns)
+    r2_path = os.path.join(out_dir, "correlation_r_squared.csv")
+    r2_table.to_csv(r2_path, index=False)
+    results = [summary_path, r2_path] + outputs
+
+    if llm_backend:
+        analyzer.llm_backend = make_backend(llm_backend)
+        analyses = analyzer.perform_openai_analysis(processed_sources)
+        analysis_path = os.path.join(out_dir, "correlation_llm_analysis.txt")
+        with open(analysis_path, 'w', encoding='utf-8') as f:
+            for source_name, analysis in analyses.items():
+                f.write(f"{source_name}\n{analysis}\n\n")
+        results.append(analysis_path)
+    return results
+
+
+def run_job(job):
+    # runs in a worker process, failures are returned instead of raised so other jobs continue
+    name, func, args = job
+    try:
+        return name, func(*args), None
+    except Exception:
+        return name, [], traceback.format_exc()
+    finally:
+        # pool workers exit without running atexit, each job writes its own trace file
+        flush()
+
+
+def build_jobs(args):
+    formats = [fmt.strip() for fmt in args.format.split(',') if fmt.strip()]
+    if args.analysis == 'seo':
+        names = output_names(args.files)
+        return [(path, run_seo, (path, args.out, formats, args.incremental, name)) for path, name in names.items()]
+    if args.analysis == 'traffic':
+        names = output_names(args.files)
+        return [(path, run_traffic, (path, args.out, formats, args.incremental, name)) for path, name in names.items()]
+    if args.analysis == 'leads':
+        names = output_names(args.files)
+        return [(path, run_leads, (path, args.items, args.out, formats, name)) for path, name in names.items()]
+
+    source_paths = {
+        source_name: getattr(args, option) for option, source_name in CORRELATION_SOURCES
+        if getattr(args, option)
+    }
+    return [("correlation", run_correlation, (source_paths, args.out, formats, args.llm))]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the data analyses headless and write figures to files")
+    parser.add_argument('--out', default='reports', help="output directory")
+    parser.add_argument('--format', default='png', help="comma separated figure formats, e.g. png,svg")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes")
+    subparsers = parser.add_subparsers(dest='analysis', required=True)
+
+    seo_parser = subparsers.add_parser('seo', help="SEO queries analysis per workbook")
+    seo_parser.add_argument('files', nargs='+')
+    seo_parser.add_argument('--incremental', action='store_true', help="ingest new months and plot stored trends only")
+
+    traffic_parser = subparsers.add_parser('traffic', help="traffic analysis per workbook")
+    traffic_parser.add_argument('files', nargs='+')
+    traffic_parser.add_argument('--incremental', action='store_true', help="ingest new months and plot stored trends only")
+
+    leads_parser = subparsers.add_parser('leads', help="lead counts per product request workbook")
+    leads_parser.add_argument('files', nargs='+')
+    leads_parser.add_argument('--items', required=True, help="items catalog workbook")
+
+    correlation_parser = subparsers.add_parser('correlation', help="cross-sheet correlation over the given sources")
+    for option, source_name in CORRELATION_SOURCES:
+        correlation_parser.add_argument(f"--{option.replace('_', '-')}", dest=option, help=f"{source_name} workbook")
+    correlation_parser.add_argument('--llm', choices=['openai', 'http', 'stub'], help="also run the LLM analysis with this backend")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        jobs = build_jobs(args)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    os.makedirs(args.out, exist_ok=True)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(jobs)))) as executor:
+        futures = [executor.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            name, outputs, error = future.result()
+            if error:
+                failures += 1
+                print(f"FAILED {name}\n{error}", file=sys.stderr)
+            else:
+                print(f"done   {name}: {', '.join(outputs)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Benchmarks for the data processing hot paths. Run from src/, e.g.
+#   python benchmarks.py keys --sizes 10000 100000 1000000
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def make_seo_key_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    queries = np.array([f"query {i}" for i in range(max(n_rows // 20, 1))], dtype=object)
+    return pd.DataFrame({
+        'Top queries': queries[rng.integers(0, len(queries), n_rows)],
+        'Position': rng.uniform(1, 50, n_rows).round(2),
+    })
+
+
+def bench_composite_keys(sizes, engines=('rowwise', 'concat', 'hash')):
+    from data_correlation import build_composite_keys
+
+    for n_rows in sizes:
+        frame = make_seo_key_frame(n_rows)
+        timings = {}
+        for engine in engines:
+            timings[engine], _ = timed(build_composite_keys, frame, engine)
+
+        baseline = timings.get('rowwise')
+        for engine in engines:
+            speedup = f" ({baseline / timings[engine]:.1f}x)" if baseline else ""
+            print(f"composite keys  rows={n_rows:>9,}  {engine:<8} {timings[engine]:8.3f}s{speedup}")
+
+
+def make_lead_requests(n_rows, n_products=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    templates = np.array([
+        'M{n} power cord', 'Product: M{n}', 'quote for Item Number: SO-{n} asap',
+        '"M{n}" in quotes', '  m{n}-x trailing  ', 'product:   {n}', '-', '', '   ',
+        'ITEM NUMBER:AB_{n}', 'Déjà M{n}', '!! no leading word', 'Cable (M{n})',
+    ], dtype=object)
+    picks = templates[rng.integers(0, len(templates), n_rows)]
+    numbers = rng.integers(10000, 10000 + n_products, n_rows)
+    return pd.Series([template.format(n=number) for template, number in zip(picks, numbers)], name='Products Requested')
+
+
+def bench_product_ids(sizes):
+    from leadanalysis import extract_product_id, extract_product_ids
+
+    for n_rows in sizes:
+        requests = make_lead_requests(n_rows)
+        rowwise, _ = timed(requests.apply, extract_product_id)
+        vectorized, _ = timed(extract_product_ids, requests)
+        print(f"product ids     rows={n_rows:>9,}  apply    {rowwise:8.3f}s ({n_rows / rowwise:,.0f} rows/s)")
+        print(f"product ids     rows={n_rows:>9,}  extract  {vectorized:8.3f}s ({n_rows / vectorized:,.0f} rows/s)")
+
+
+def bench_ranking(sizes, k=10):
+    from ranking import top_rows
+
+    for n_groups in sizes:
+        totals = pd.DataFrame({'Clicks': np.random.default_rng(0).integers(0, 10_000, n_groups)},
+                              index=pd.Index([f"query {i}" for i in range(n_groups)], name='Top queries'))
+        full_sort, _ = timed(lambda: totals.sort_values(by='Clicks', ascending=False).head(k), repeat=3)
+        selected, _ = timed(top_rows, totals, 'Clicks', k, repeat=3)
+        print(f"top {k:<3}         groups={n_groups:>9,}  sort     {full_sort:8.4f}s")
+        print(f"top {k:<3}         groups={n_groups:>9,}  top_k    {selected:8.4f}s")
+
+
+# the module imports main.py performed before the open_* handlers imported lazily
+EAGER_IMPORTS = "import trafficanalysis, leadanalysis, seoqueriesanalysis, data_correlation, seodashboard, trafficdashboard"
+
+
+def time_python(code, repeat):
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=src_dir, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_startup(repeat):
+    # fresh interpreter per run, so every run pays the full import cost
+    baseline = time_python("pass", repeat)
+    eager = time_python(f"import main; {EAGER_IMPORTS}", repeat)
+    lazy = time_python("import main", repeat)
+    print(f"startup  interpreter only         {baseline:8.3f}s")
+    print(f"startup  eager analysis imports   {eager:8.3f}s")
+    print(f"startup  lazy main.py             {lazy:8.3f}s ({eager / lazy:.1f}x faster)")
+
+
+# Suite: synthetic workbooks in the schemas the loaders expect, and timings of every analysis
+# entry point, written as JSON so two versions can be compared. Workbooks are generated once
+# per size/seed under --workdir. Sizes above the Excel row limit skip the workbook loaders,
+# and their frames are built in memory the same way the loaders would leave them.
+#   python benchmarks.py suite --sizes 10000 100000 --json results/baseline.json
+#   python benchmarks.py compare results/baseline.json results/new.json
+EXCEL_MAX_ROWS = 1_048_575
+SUITE_MONTHS = pd.date_range('2023-01-01', periods=24, freq='MS')
+FIRST_LEVELS = np.array(['products', 'support', 'blog', 'catalog', 'resources', 'about'], dtype=object)
+
+
+def skewed_choice(rng, values, n_rows, shape=1.2):
+    # a few values are very frequent, like real queries and items
+    return values[(rng.pareto(shape, n_rows) * len(values) / 20).astype(np.int64) % len(values)]
+
+
+def make_items_catalog(n_items, seed=0):
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(10000, 10000 + n_items)
+    return pd.DataFrame({
+        'item_number': [f"M{n}" for n in numbers],
+        'item_product_group': [f"Group {g}" for g in rng.integers(0, 40, n_items)],
+        'item_description': [f"Cable assembly {n} type {t}" for n, t in zip(numbers, rng.integers(0, 9, n_items))],
+    })
+
+
+def month_labels(rng, n_rows, date_format):
+    labels = np.array(SUITE_MONTHS.strftime(date_format), dtype=object)
+    return labels[rng.integers(0, len(labels), n_rows)]
+
+
+def make_seo_queries(n_rows, seed=0, date_format='%b-%Y', item_numbers=()):
+    # item numbers are searched for directly too, which gives the correlation join shared keys
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"query {i} cable adapter" for i in range(max(n_rows // 20, 1))] + list(item_numbers),
+                          dtype=object)
+    impressions = rng.integers(1, 5000, n_rows)
+    clicks = rng.binomial(impressions, 0.03)
+    return pd.DataFrame({
+        'Top queries': skewed_choice(rng, vocabulary, n_rows),
+        'Clicks': clicks,
+        'Impressions': impressions,
+        'CTR': clicks / impressions,
+        'Position': rng.uniform(1, 50, n_rows).round(2),
+        'Mon-Year': month_labels(rng, n_rows, date_format),
+    })
+
+
+def make_seo_pages(n_rows, catalog, seed=0, date_format='%Y-%m-%d'):
+    rng = np.random.default_rng(seed)
+    items = skewed_choice(rng, catalog['item_number'].to_numpy(dtype=object), n_rows)
+    levels = FIRST_LEVELS[rng.integers(0, len(FIRST_LEVELS), n_rows)]
+    frame = make_seo_queries(n_rows, seed=seed, date_format=date_format).drop(columns='Top queries')
+    frame.insert(0, 'Page', '/' + levels + '/' + items)
+    return frame
+
+
+def make_traffic(n_rows, catalog, seed=0):
+    rng = np.random.default_rng(seed)
+    viewed = rng.integers(0, 500, n_rows)
+    added = rng.binomial(viewed, 0.1)
+    purchased = rng.binomial(added, 0.3)
+    return pd.DataFrame({
+        'Item name': skewed_choice(rng, catalog['item_number'].to_numpy(dtype=object), n_rows),
+        'Items viewed': viewed,
+        'Items added to cart': added,
+        'Items purchased': purchased,
+        'Item revenue': (purchased * rng.uniform(5, 200, n_rows)).round(2),
+        'Mon-Year': month_labels(rng, n_rows, '%b-%Y'),
+    })
+
+
+def make_leads(n_rows, catalog, seed=0):
+    # a fifth of the requests are just an item number
+    rng = np.random.default_rng(seed)
+    requests = make_lead_requests(n_rows, n_products=len(catalog), seed=seed).to_numpy(dtype=object)
+    bare = rng.random(n_rows) < 0.2
+    requests[bare] = skewed_choice(rng, catalog['item_number'].to_numpy(dtype=object), int(bare.sum()))
+    return pd.DataFrame({'Products Requested': requests})
+
+
+def suite_frames(n_rows, seed=0):
+    n_items = min(max(n_rows // 50, 100), 50_000)
+    catalog = make_items_catalog(n_items, seed)
+    return {
+        'items_catalog': catalog,
+        'seo_queries': make_seo_queries(n_rows, seed, item_numbers=catalog['item_number']),
+        'seo_pages': make_seo_pages(n_rows, catalog, seed + 1),
+        'traffic': make_traffic(n_rows, catalog, seed + 2),
+        'leads': make_leads(n_rows, catalog, seed + 3),
+    }
+
+
+def write_suite_workbooks(frames, directory):
+    # xlsx for the workbook loaders, plus a csv copy of the leads for the streaming path
+    sheet_names = {'items_catalog': 'Items Catalog', 'seo_queries': 'SEO Queries', 'seo_pages': 'SEO Pages'}
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, frame in frames.items():
+        paths[name] = os.path.join(directory, f"{name}.xlsx")
+        if not os.path.exists(paths[name]):
+            frame.to_excel(paths[name], sheet_name=sheet_names.get(name, 'Sheet1'), index=False)
+    paths['leads_csv'] = os.path.join(directory, 'leads.csv')
+    if not os.path.exists(paths['leads_csv']):
+        frames['leads'].to_csv(paths['leads_csv'], index=False)
+    return paths
+
+
+def as_loaded(frame, profile, date_format=None):
+    # the frame as the loaders return it: parsed Mon-Year and the dtype profile applied
+    from dtypeprofiles import apply_profile
+
+    frame = frame.copy()
+    if date_format:
+        frame['Mon-Year'] = pd.to_datetime(frame['Mon-Year'], format=date_format)
+    return apply_profile(frame, profile)
+
+
+def bench_dashboard(frames):
+    from seodashboard import SEOAnalysisDashboard
+
+    dashboard = SEOAnalysisDashboard.__new__(SEOAnalysisDashboard)
+    dashboard.items_catalog = as_loaded(frames['items_catalog'], 'items_catalog')
+    dashboard.seo_queries = as_loaded(frames['seo_queries'], 'seo_queries', '%b-%Y')
+    dashboard.seo_pages = as_loaded(frames['seo_pages'], 'seo_pages', '%Y-%m-%d')
+    prepare, _ = timed(dashboard.prepare_data)
+
+    groups = dashboard.item_product_group_mapping['item_product_group'].tolist()
+    start, end = SUITE_MONTHS[3], SUITE_MONTHS[14]
+    # first selection of a group builds its page cube, later selections reuse it
+    first, _ = timed(lambda: [dashboard.dashboard_tables(group, start, end) for group in groups[:5]])
+    repeat, _ = timed(lambda: [dashboard.dashboard_tables(group, start, end) for group in groups[:5]])
+    timings = {'prepare_data': prepare, 'update_first_5_groups': first, 'update_repeat_5_groups': repeat}
+    timings.update(bench_table_model(dashboard.dashboard_tables(groups[0], start, end)[2]))
+    return timings
+
+
+def bench_table_model(top_queries, page_rows=15):
+    from virtualtable import TableModel
+
+    build, model = timed(TableModel.from_frame, top_queries, 'Top Queries')
+    # first sort of every column computes its argsort, later sorts and pages reuse it
+    sort, _ = timed(lambda: [model.sort(name, descending) for name in model.names for descending in (True, False)])
+    model.sort('Clicks', descending=True)
+    starts = np.linspace(0, max(model.n_rows - page_rows, 0), 100).astype(int)
+    page, _ = timed(lambda: [model.window(start, page_rows) for start in starts])
+    return {'table_model_build': build, 'table_model_sort_all_columns': sort, 'table_model_100_pages': page}
+
+
+def bench_correlation(frames, out_dir):
+    from data_correlation import AdvancedDataAnalyzer
+
+    sources = {"SEO Queries": 'seo_queries', "Traffic Data": 'traffic', "Leads Data": 'leads',
+               "SEO Pages": 'seo_pages', "Items Catalog": 'items_catalog'}
+    analyzer = AdvancedDataAnalyzer()
+    for source_name, key in sources.items():
+        analyzer.data_sources[source_name] = analyzer.profile_source(source_name, frames[key].copy())
+    prepare, (processed_sources, _) = timed(analyzer.prepare_correlations)
+    pattern = os.path.join(out_dir, 'pca_{source}.png')
+    pca, _ = timed(analyzer.perform_pca_and_regression, processed_sources, output_pattern=pattern)
+    return {'prepare_correlations': prepare, 'pca_and_regression': pca}
+
+
+def run_suite_size(n_rows, workdir, seed, record):
+    import datacache
+    from trafficanalysis import load_data, perform_analysis
+    from seoqueriesanalysis import load_queries, run_all_analyses
+    from leadanalysis import compute_product_counts
+
+    frames = suite_frames(n_rows, seed)
+    out_dir = os.path.join(workdir, 'figures')
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = {}
+    if n_rows <= EXCEL_MAX_ROWS:
+        seconds, paths = timed(write_suite_workbooks, frames, os.path.join(workdir, f"rows_{n_rows}_seed_{seed}"))
+        print(f"  workbooks ready ({seconds:.1f}s)")
+        datacache.clear_cache()
+        record('traffic.load_data', n_rows, 'cold', lambda: load_data(paths['traffic']))
+        record('traffic.load_data', n_rows, 'warm', lambda: load_data(paths['traffic']))
+        record('seo_queries.load_queries', n_rows, 'cold', lambda: load_queries(paths['seo_queries']))
+        record('seo_queries.load_queries', n_rows, 'warm', lambda: load_queries(paths['seo_queries']))
+        record('leads.compute_product_counts', n_rows, 'xlsx',
+               lambda: compute_product_counts(paths['leads'], paths['items_catalog'], stream=False))
+    else:
+        paths['leads_csv'] = os.path.join(workdir, f"leads_{n_rows}_seed_{seed}.csv")
+        if not os.path.exists(paths['leads_csv']):
+            frames['leads'].to_csv(paths['leads_csv'], index=False)
+        paths['items_catalog'] = os.path.join(workdir, f"items_catalog_{n_rows}_seed_{seed}.xlsx")
+        if not os.path.exists(paths['items_catalog']):
+            frames['items_catalog'].to_excel(paths['items_catalog'], index=False)
+    record('leads.compute_product_counts', n_rows, 'csv_stream',
+           lambda: compute_product_counts(paths['leads_csv'], paths['items_catalog'], stream=True))
+
+    traffic = as_loaded(frames['traffic'], 'traffic', '%b-%Y')
+    queries = as_loaded(frames['seo_queries'], 'seo_queries', '%b-%Y')
+    record('trafficanalysis.perform_analysis', n_rows, 'png',
+           lambda: perform_analysis(traffic, output=os.path.join(out_dir, 'traffic.png')))
+    record('seoqueriesanalysis.run_all_analyses', n_rows, 'png',
+           lambda: run_all_analyses(queries, output=os.path.join(out_dir, 'seo.png')))
+    record('seodashboard', n_rows, None, lambda: bench_dashboard(frames))
+    record('data_correlation.find_cross_sheet_correlations', n_rows, None,
+           lambda: bench_correlation(frames, out_dir))
+
+
+def suite_metadata():
+    import platform
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def bench_suite(sizes, workdir, seed, json_path):
+    import json
+
+    # isolate caches and the analytics database from the real ones, before the modules read them
+    os.makedirs(workdir, exist_ok=True)
+    os.environ['DATA_CACHE_DIR'] = os.path.join(workdir, 'datacache')
+    os.environ['ANALYTICS_DB'] = os.path.join(workdir, 'analytics.db')
+    os.environ['LLM_CACHE_DIR'] = os.path.join(workdir, 'llmcache')
+    import matplotlib
+    matplotlib.use('Agg')
+
+    results = []
+
+    def record(name, n_rows, variant, func):
+        entry = {'benchmark': name, 'variant': variant, 'rows': n_rows}
+        try:
+            seconds, detail = timed(func)
+            entry['seconds'] = round(seconds, 4)
+            if isinstance(detail, dict):
+                # benchmarks that time their own phases return {phase: seconds}
+                entry['phases'] = {phase: round(value, 4) for phase, value in detail.items()}
+        except Exception as e:
+            entry['error'] = f"{type(e).__name__}: {e}"
+        results.append(entry)
+        label = f"{name}{f' [{variant}]' if variant else ''}"
+        outcome = f"{entry['seconds']:8.3f}s" if 'seconds' in entry else f"failed ({entry['error']})"
+        print(f"{label:<58} rows={n_rows:>10,}  {outcome}")
+
+    for n_rows in sizes:
+        print(f"suite rows={n_rows:,}")
+        run_suite_size(n_rows, workdir, seed, record)
+
+    report = {'meta': suite_metadata(), 'sizes': sizes, 'seed': seed, 'results': results}
+    if json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {json_path}")
+    return report
+
+
+def compare_results(baseline_path, current_path, threshold):
+    # ratio current/baseline per benchmark and phase, exit status 1 if anything got slower than threshold
+    import json
+
+    def timings(path):
+        with open(path) as f:
+            report = json.load(f)
+        flat = {}
+        for entry in report['results']:
+            key = (entry['benchmark'], entry['variant'] or '', entry['rows'])
+            if 'seconds' in entry:
+                flat[key + ('total',)] = entry['seconds']
+            for phase, seconds in entry.get('phases', {}).items():
+                flat[key + (phase,)] = seconds
+        return report['meta'], flat
+
+    baseline_meta, baseline = timings(baseline_path)
+    current_meta, current = timings(current_path)
+    print(f"baseline {baseline_meta.get('commit')} ({baseline_meta.get('timestamp')}) vs "
+          f"current {current_meta.get('commit')} ({current_meta.get('timestamp')})")
+
+    regressions = 0
+    for key in sorted(set(baseline) & set(current)):
+        before, after = baseline[key], current[key]
+        ratio = after / before if before else float('inf')
+        flag = ''
+        if ratio > threshold and after - before > 0.01:
+            flag = '  <-- slower'
+            regressions += 1
+        name, variant, n_rows, phase = key
+        label = f"{name}{f' [{variant}]' if variant else ''} {phase}"
+        print(f"{label:<72} rows={n_rows:>10,}  {before:8.3f}s -> {after:8.3f}s  x{ratio:5.2f}{flag}")
+    for key in sorted(set(baseline) ^ set(current)):
+        print(f"only in {'baseline' if key in baseline else 'current'}: {key}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data analysis hot paths")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    keys_parser = subparsers.add_parser('keys', help="composite key engines in data_correlation")
+    keys_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+
+    leads_parser = subparsers.add_parser('product-ids', help="product id extraction in leadanalysis (checks parity first)")
+    leads_parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+
+    ranking_parser = subparsers.add_parser('ranking', help="top-k selection in ranking.py vs full sorts (checks parity first)")
+    ranking_parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+
+    startup_parser = subparsers.add_parser('startup', help="cold start of main.py, eager vs lazy imports")
+    startup_parser.add_argument('--repeat', type=int, default=5)
+
+    suite_parser = subparsers.add_parser('suite', help="synthetic workbooks, every analysis entry point, JSON results")
+    suite_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    suite_parser.add_argument('--workdir', default='.benchmarks', help="generated workbooks and caches")
+    suite_parser.add_argument('--seed', type=int, default=0)
+    suite_parser.add_argument('--json', help="write the results to this file")
+
+    compare_parser = subparsers.add_parser('compare', help="compare two suite JSON files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+
+    args = parser.parse_args()
+    if args.benchmark == 'keys':
+        bench_composite_keys(args.sizes)
+    elif args.benchmark == 'product-ids':
+        bench_product_ids(args.sizes)
+    elif args.benchmark == 'ranking':
+        bench_ranking(args.sizes)
+    elif args.benchmark == 'startup':
+        bench_startup(args.repeat)
+    elif args.benchmark == 'suite':
+        bench_suite(args.sizes, args.workdir, args.seed, args.json)
+    elif args.benchmark == 'compare':
+        sys.exit(compare_results(args.baseline, args.current, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
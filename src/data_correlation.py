@@ -1,20 +1,107 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-from tkinter import filedialog, messagebox
-import tkinter as tk
 import re
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-import openai
+from datacache import read_excel_cached
+from dtypeprofiles import apply_profile
+from joinengine import CrossSourceJoin
+from regression import analyze_sources
+from llmclient import AnalysisClient, ResponseCache, make_backend
+from fuzzymatch import match_descriptions
+from taskrunner import run_task
+from plotting import density_plot, save_or_show, use_density
+from instrumentation import traced
+
+KEY_ENGINES = ('rowwise', 'concat', 'hash')
+
+# dtype profile (dtypeprofiles.PROFILES) applied to each data source when it is loaded
+SOURCE_PROFILES = {
+    "SEO Queries": 'seo_queries',
+    "Traffic Data": 'traffic',
+    "Leads Data": 'leads',
+    "SEO Pages": 'seo_pages',
+    "Items Catalog": 'items_catalog',
+}
+
+# columns each source's composite key, description and join key are fuzzy-matched from
+KEY_STRATEGIES = {
+    "SEO Queries": {
+        "key_columns": ['Top queries', 'Position'],
+        "key_engine": 'concat',
+        "description_column": ['Top queries', 'Queries']
+    },
+    "Traffic Data": {
+        "key_columns": ['Item name', 'Items viewed', 'Item'],
+        "key_engine": 'concat',
+        "description_column": ['Item name', 'Item']
+    },
+    "Leads Data": {
+        "key_columns": ['Products Requested', 'Product ID', 'Product'],
+        "key_engine": 'concat',
+        "description_column": ['Products Requested', 'Product']
+    },
+    "SEO Pages": {
+        "key_columns": ['Page', 'Clicks', 'URL'],
+        "key_engine": 'concat',
+        "description_column": ['Page', 'URL']
+    },
+    "Items Catalog": {
+        "key_columns": ['item_number', 'item_product_group', 'Item Number'],
+        "key_engine": 'concat',
+        "description_column": ['item_description', 'Description'],
+        # traffic item names and lead requests refer to catalog items by number
+        "join_column": ['item_number', 'Item Number']
+    }
+}
+
+def common_key_dtype(dtypes):
+    # the dtype apply(axis=1) upcasts a row to: numpy promotion for plain numeric columns,
+    # a shared extension dtype as is, object for anything mixed (bool with numbers included)
+    if all(isinstance(dtype, np.dtype) for dtype in dtypes):
+        kinds = {dtype.kind for dtype in dtypes}
+        if 'b' in kinds and kinds != {'b'}:
+            return object
+        try:
+            return np.result_type(*dtypes)
+        except TypeError:
+            return object
+    if all(dtype == dtypes[0] for dtype in dtypes):
+        return dtypes[0]
+    return object
+
+@traced
+def build_composite_keys(frame, engine='concat'):
+    if engine == 'rowwise':
+        return frame.apply(lambda row: '_'.join(row.astype(str)), axis=1)
+
+    # rows handed to apply(axis=1) are upcast to the frame's common dtype,
+    # cast the same way first so every engine formats values identically
+    # (key columns can repeat when two candidates fuzzy-match the same column)
+    common_dtype = common_key_dtype(list(frame.dtypes))
+    parts = [frame.iloc[:, i].astype(common_dtype).astype(str) for i in range(frame.shape[1])]
+
+    keys = parts[0].str.cat(parts[1:], sep='_') if len(parts) > 1 else parts[0]
+    if engine == 'concat':
+        return keys
+    if engine == 'hash':
+        # 64-bit hash of the same string key, equal keys map to equal hashes
+        return pd.util.hash_pandas_object(keys, index=False)
+    raise ValueError(f"Unknown key engine: {engine}")
 
 class AdvancedDataAnalyzer:
-    def __init__(self):
+    def __init__(self, root=None):
+        self.root = root
         self.data_sources = {}
         self.correlation_matrix = None
+        self.cross_source_join = None
+        self.regression_results = None
         self.openai_api_key = ""  
+        # backend object for perform_openai_analysis, None picks one from LLM_BACKEND (see llmclient)
+        self.llm_backend = None
+        # per data source override of the composite key engine, see KEY_ENGINES
+        self.key_engines = {}
+        # column each source joins on in the cross-source join, when it is not description_key
+        self.join_columns = {}
 
     #fuzzy matching by normalizing
 
@@ -32,7 +119,25 @@ class AdvancedDataAnalyzer:
         
         return None
 
+    def key_columns(self, df, data_type):
+        matched_key_columns = []
+        for potential_column in KEY_STRATEGIES.get(data_type, {}).get('key_columns', []):
+            matched_col = self.fuzzy_column_match(df, potential_column)
+            if matched_col:
+                matched_key_columns.append(matched_col)
+        return matched_key_columns
+
+    def profile_source(self, data_type, df, report=False):
+        #numeric key columns keep their loaded dtype, float32 or downcast values would change the
+        #composite keys (44.380001068115234 for 44.38, 5 for 5.0). key text can be category, it formats the same
+        if data_type not in SOURCE_PROFILES:
+            return df
+        keep = [col for col in self.key_columns(df, data_type) if pd.api.types.is_numeric_dtype(df[col])]
+        return apply_profile(df, SOURCE_PROFILES[data_type], report=report, keep=keep)
+
     def load_data_sources(self):
+        #tkinter is only imported by the dialogs so batch runs can load this module headless
+        from tkinter import filedialog
         file_types = [
             ("SEO Queries", "seo_queries.xlsx"),
             ("Traffic Data", "traffic.xlsx"),
@@ -41,64 +146,61 @@ class AdvancedDataAnalyzer:
             ("Items Catalog", "items_catalog.xlsx")
         ]
 
+        selected_files = []
         for file_type, default_name in file_types:
             file_path = filedialog.askopenfilename(
                 title=f"Select {file_type} Excel File", 
                 filetypes=[("Excel files", "*.xlsx;*.xls")]
             )
             if file_path:
-                try:
-                    df = pd.read_excel(file_path)
-                    self.data_sources[file_type] = df
-                except Exception as e:
-                    messagebox.showerror("File Load Error", f"Error loading {file_type}: {str(e)}")
+                selected_files.append((file_type, file_path))
+
+        run_task(self.root, self.read_data_sources, selected_files, on_done=self.show_load_errors, title="Loading data sources...")
+
+    @traced
+    def read_data_sources(self, selected_files, progress=None):
+        #runs on the worker thread, errors are reported back on the UI thread
+        errors = []
+        for file_type, file_path in selected_files:
+            if progress:
+                progress(f"Loading {file_type}...")
+            try:
+                self.data_sources[file_type] = self.profile_source(file_type, read_excel_cached(file_path))
+            except Exception as e:
+                errors.append((file_type, e))
+        return errors
 
+    def show_load_errors(self, errors):
+        from tkinter import messagebox
+        for file_type, e in errors:
+            messagebox.showerror("File Load Error", f"Error loading {file_type}: {str(e)}")
+
+    @traced
     def create_composite_key(self, data_type):
         #https://www.ibm.com/docs/en/zvm/7.4?topic=keys-match
         #https://www.youtube.com/watch?v=_2HODd8Gq3A
         df = self.data_sources[data_type].copy()
         
-        key_strategies = {
-            "SEO Queries": {
-                "key_columns": ['Top queries', 'Position'],
-                "description_column": ['Top queries', 'Queries']
-            },
-            "Traffic Data": {
-                "key_columns": ['Item name', 'Items viewed', 'Item'],
-                "description_column": ['Item name', 'Item']
-            },
-            "Leads Data": {
-                "key_columns": ['Products Requested', 'Product ID', 'Product'],
-                "description_column": ['Products Requested', 'Product']
-            },
-            "SEO Pages": {
-                "key_columns": ['Page', 'Clicks', 'URL'],
-                "description_column": ['Page', 'URL']
-            },
-            "Items Catalog": {
-                "key_columns": ['item_number', 'item_product_group', 'Item Number'],
-                "description_column": ['item_description', 'Description']
-            }
-        }
+        strategy = KEY_STRATEGIES.get(data_type, {})
+        key_engine = self.key_engines.get(data_type, strategy.get('key_engine', 'concat'))
 
-        strategy = key_strategies.get(data_type, {})
-
-        matched_key_columns = []
-        for potential_column in strategy.get('key_columns', []):
-            matched_col = self.fuzzy_column_match(df, potential_column)
-            if matched_col:
-                matched_key_columns.append(matched_col)
+        matched_key_columns = self.key_columns(df, data_type)
         description_column = None
         for potential_column in strategy.get('description_column', []):
             matched_col = self.fuzzy_column_match(df, potential_column)
             if matched_col:
                 description_column = matched_col
                 break
+        for potential_column in strategy.get('join_column', []):
+            matched_col = self.fuzzy_column_match(df, potential_column)
+            if matched_col:
+                self.join_columns[data_type] = matched_col
+                break
 
         # create composite key if possible
         if matched_key_columns:
             try:
-                df['composite_key'] = df[matched_key_columns].apply(lambda row: '_'.join(row.astype(str)), axis=1)
+                df['composite_key'] = build_composite_keys(df[matched_key_columns], key_engine)
             except Exception as e:
                 print(f"Warning: Could not create composite key for {data_type}. Error: {e}")
         
@@ -108,28 +210,69 @@ class AdvancedDataAnalyzer:
         
         return df
 
+    @traced
     def find_cross_sheet_correlations(self):
-        try:
-            processed_sources = {
-                name: self.create_composite_key(name) 
-                for name in self.data_sources.keys()
+        from tkinter import messagebox
+        run_task(
+            self.root, self.prepare_correlations,
+            on_done=self.show_correlations,
+            on_error=lambda e: messagebox.showerror("Correlation Error", f"Error finding cross-sheet correlations: {str(e)}"),
+            title="Finding cross-sheet correlations..."
+        )
+
+    @traced
+    def prepare_correlations(self, progress=None):
+        if progress:
+            progress("Building composite keys...")
+        processed_sources = {
+            name: self.create_composite_key(name) 
+            for name in self.data_sources.keys()
+        }
+        correlation_data = {}
+        for source_name, source_df in processed_sources.items():
+            correlation_data[source_name] = {
+                'total_entries': len(source_df),
+                'unique_entries': len(source_df.get('description_key', source_df.index).unique()),
+                'sample_keys': source_df.get('description_key', source_df.index).head(5).tolist()
             }
-            correlation_data = {}
-            for source_name, source_df in processed_sources.items():
-                correlation_data[source_name] = {
-                    'total_entries': len(source_df),
-                    'unique_entries': len(source_df.get('description_key', source_df.index).unique()),
-                    'sample_keys': source_df.get('description_key', source_df.index).head(5).tolist()
-                }
 
+        # index every source's join keys once, then match all source pairs
+        if progress:
+            progress("Matching keys across sources...")
+        self.cross_source_join = CrossSourceJoin(processed_sources, key_columns=self.join_columns)
+        print("Cross-source key matches:")
+        print(self.cross_source_join.summary().to_string(index=False))
+        return processed_sources, correlation_data
+
+    def show_correlations(self, prepared):
+        from tkinter import messagebox
+        processed_sources, correlation_data = prepared
+        try:
             self.visualize_data_correlation(correlation_data)
-            self.perform_openai_analysis(processed_sources)
-            self.perform_pca_and_regression(processed_sources)
+            # network bound, runs on the task runner next to the PCA fits
+            run_task(self.root, self.perform_openai_analysis, processed_sources, title="Running OpenAI analysis...")
+            # the fits run on the task runner too, only the plots are drawn on the Tk thread
+            run_task(
+                self.root, self.compute_pca_and_regression, processed_sources,
+                on_done=lambda results: self.plot_pca_and_regression(processed_sources, results),
+                on_error=lambda e: messagebox.showerror("Correlation Error", f"Error performing PCA and regression: {str(e)}"),
+                title="Running PCA and regression..."
+            )
         except Exception as e:
             messagebox.showerror("Correlation Error", f"Error finding cross-sheet correlations: {str(e)}")
 
-    def visualize_data_correlation(self, correlation_data):
-        plt.figure(figsize=(12, 6))
+    @traced
+    def fuzzy_description_matches(self, left_source, right_source, top_k=3, min_score=0.5):
+        #approximate description matching, e.g. Leads 'Products Requested' against the catalog
+        left_df = self.create_composite_key(left_source)
+        right_df = self.create_composite_key(right_source)
+        if 'description_key' not in left_df or 'description_key' not in right_df:
+            raise ValueError(f"No description column found for {left_source} or {right_source}")
+        return match_descriptions(left_df['description_key'], right_df['description_key'], top_k=top_k, min_score=min_score)
+
+    @traced
+    def visualize_data_correlation(self, correlation_data, output=None):
+        fig = plt.figure(figsize=(12, 6))
         sources = list(correlation_data.keys())
         total_entries = [data['total_entries'] for data in correlation_data.values()]
         unique_entries = [data['unique_entries'] for data in correlation_data.values()]
@@ -149,59 +292,85 @@ class AdvancedDataAnalyzer:
         plt.xticks(rotation=45)
 
         plt.tight_layout()
-        plt.show()
+        save_or_show(fig, output)
 
+    @traced
     def perform_openai_analysis(self, processed_sources):
+        #all sources are sent concurrently, repeated prompts are answered from the on-disk cache
+        #returns {source: analysis text}
 
-        openai.api_key = self.openai_api_key
+        prompts = {
+            source_name: f"Provide a detailed analysis of the '{source_name}' data, including key insights, notable trends, and potential relationships with other data sources."
+            for source_name in processed_sources
+        }
+        try:
+            backend = self.llm_backend or make_backend(api_key=self.openai_api_key)
+        except (ImportError, ValueError) as e:
+            print(f"Error running OpenAI analysis: {str(e)}")
+            return {}
+        client = AnalysisClient(backend, ResponseCache())
+        results = client.analyze(prompts, max_tokens=1024, temperature=0.5)
 
-        for source_name, source_df in processed_sources.items():
-            try:
-                prompt = f"Provide a detailed analysis of the '{source_name}' data, including key insights, notable trends, and potential relationships with other data sources."
-                response = openai.Completion.create(
-                    engine="text-davinci-002",
-                    prompt=prompt,
-                    max_tokens=1024,
-                    n=1,
-                    stop=None,
-                    temperature=0.5,
-                )
-                analysis = response.choices[0].text
-                print(f"OpenAI Analysis for {source_name}:\n{analysis}\n")
-            except Exception as e:
-                print(f"Error running OpenAI analysis for {source_name}: {str(e)}")
+        analyses = {}
+        for source_name, result in results.items():
+            if isinstance(result, Exception):
+                print(f"Error running OpenAI analysis for {source_name}: {str(result)}")
+                continue
+            analyses[source_name] = result
+            print(f"OpenAI Analysis for {source_name}:\n{result}\n")
+        return analyses
 
-    def perform_pca_and_regression(self, processed_sources):
+    @traced
+    def perform_pca_and_regression(self, processed_sources, output_pattern=None):
+        #output_pattern, e.g. 'report/pca_{source}.png' (or a list of them), saves each plot instead of showing it
+        #returns the R-squared table (source, target, r_squared, n_rows, n_features), also kept in self.regression_results
+        results = self.compute_pca_and_regression(processed_sources)
+        return self.plot_pca_and_regression(processed_sources, results, output_pattern)
 
-        for source_name, source_df in processed_sources.items():
+    @traced
+    def compute_pca_and_regression(self, processed_sources, progress=None):
+        #no Tk or pyplot calls here, the dashboard runs it on a worker thread
+        if progress:
+            progress("Fitting PCA and regression...")
+        results, self.regression_results = analyze_sources(processed_sources)
+        return results
+
+    @traced
+    def plot_pca_and_regression(self, processed_sources, results, output_pattern=None):
+        for source_name, result in results.items():
+            if isinstance(result, Exception):
+                print(f"Error performing PCA and regression for {source_name}: {str(result)}")
+                continue
             try:
-                # Prepare the data for PCA and regression
-                numeric_cols = source_df.select_dtypes(include=['number']).columns
-                X = source_df[numeric_cols].values
-                scaler = StandardScaler()
-                X_scaled = scaler.fit_transform(X)
-                pca = PCA(n_components=2)
-                X_pca = pca.fit_transform(X_scaled)
+                X_pca, _ = result
+                source_df = processed_sources[source_name]
                 source_df['PCA_1'] = X_pca[:, 0]
                 source_df['PCA_2'] = X_pca[:, 1]
 
-                # linear regression
-                for target_col in numeric_cols:
-                    model = LinearRegression()
-                    model.fit(X_scaled, source_df[target_col])
-                    r_squared = model.score(X_scaled, source_df[target_col])
-                    print(f"Linear Regression for {source_name} '{target_col}': R-squared = {r_squared:.2f}")
-
-                plt.figure(figsize=(8, 8))
-                plt.scatter(source_df['PCA_1'], source_df['PCA_2'])
+                fig = plt.figure(figsize=(8, 8))
+                if use_density(len(source_df)):
+                    density_plot(plt.gca(), source_df['PCA_1'], source_df['PCA_2'])
+                else:
+                    plt.scatter(source_df['PCA_1'], source_df['PCA_2'])
                 plt.title(f"PCA for {source_name}")
                 plt.xlabel('PCA 1')
                 plt.ylabel('PCA 2')
-                plt.show()
+                output = None
+                if output_pattern:
+                    patterns = [output_pattern] if isinstance(output_pattern, str) else output_pattern
+                    output = [pattern.format(source=source_name.lower().replace(' ', '_')) for pattern in patterns]
+                save_or_show(fig, output)
             except Exception as e:
                 print(f"Error performing PCA and regression for {source_name}: {str(e)}")
 
+        if len(self.regression_results):
+            print("Linear Regression R-squared (each target on the other numeric columns):")
+            print(self.regression_results.to_string(index=False, float_format='{:.2f}'.format))
+        return self.regression_results
+
+    @traced
     def generate_comprehensive_report(self):
+        from tkinter import messagebox
         report_text = "Comprehensive Data Analysis Report\n\n"
         
         for source, data in self.data_sources.items():
@@ -213,10 +382,11 @@ class AdvancedDataAnalyzer:
         messagebox.showinfo("Report Generated", "Comprehensive report saved as comprehensive_data_report.txt")
 
 def launch_advanced_data_analysis():
+    import tkinter as tk
     root = tk.Tk()
     root.title("Advanced Data Analysis")
     
-    analyzer = AdvancedDataAnalyzer()
+    analyzer = AdvancedDataAnalyzer(root)
     load_data_btn = tk.Button(root, text="Load Data Sources", command=analyzer.load_data_sources)
     correlate_btn = tk.Button(root, text="Find Cross-Sheet Correlations", command=analyzer.find_cross_sheet_correlations)
     generate_report_btn = tk.Button(root, text="Generate Comprehensive Report", command=analyzer.generate_comprehensive_report)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import tempfile
+import pandas as pd
+from instrumentation import span, traced
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Arrow IPC cache in front of pd.read_excel. Each workbook/sheet is converted once,
+# later loads memory-map the .arrow file instead of re-parsing the XLSX.
+CACHE_DIR = os.environ.get('DATA_CACHE_DIR', '.datacache')
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_paths(file_path, read_kwargs):
+    source = os.path.abspath(file_path)
+    options = json.dumps(read_kwargs, sort_keys=True, default=str)
+    name = hashlib.sha1(f"{source}|{options}".encode('utf-8')).hexdigest()
+    base = os.path.join(CACHE_DIR, name)
+    return base + '.arrow', base + '.json'
+
+
+def is_cache_valid(file_path, meta_path):
+    if not os.path.exists(meta_path):
+        return False, None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    stat = os.stat(file_path)
+    if meta.get('mtime') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return True, meta
+
+    # mtime changed (copied/touched file), only rebuild if the content did too
+    if meta.get('size') == stat.st_size and meta.get('sha1') == file_digest(file_path):
+        meta['mtime'] = stat.st_mtime_ns
+        try:
+            write_meta(meta_path, meta)
+        except OSError as e:
+            print(f"Could not refresh cache metadata for {file_path}: {e}")
+        return True, meta
+    return False, meta
+
+
+def temp_path(target_path):
+    # unique temp file next to the target, so processes caching the same source don't share it
+    directory = os.path.dirname(target_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    return tmp_path
+
+
+def replace_from_temp(write, target_path):
+    # write(tmp_path) then rename over the target, the temp file is removed if anything fails
+    tmp_path = temp_path(target_path)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_meta(meta_path, meta):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+    replace_from_temp(write, meta_path)
+
+
+@traced
+def read_arrow(arrow_path):
+    with pa.memory_map(arrow_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def write_arrow(df, arrow_path, preserve_index=False):
+    table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    replace_from_temp(write, arrow_path)
+
+
+def write_cache(df, file_path, arrow_path, meta_path):
+    # the frame is already loaded, so a failed cache write only costs the next load a re-parse
+    try:
+        write_arrow(df, arrow_path)
+        stat = os.stat(file_path)
+        write_meta(meta_path, {
+            'source': os.path.abspath(file_path),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha1': file_digest(file_path),
+        })
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        # mixed-type object columns can't be stored as Arrow, just skip caching them
+        print(f"Skipping cache for {file_path}: {e}")
+    except OSError as e:
+        print(f"Could not write cache for {file_path}: {e}")
+
+
+@traced
+def read_excel_cached(file_path, **read_kwargs):
+    if pa is None:
+        with span('pandas.read_excel', path=str(file_path)):
+            return pd.read_excel(file_path, **read_kwargs)
+
+    arrow_path, meta_path = cache_paths(file_path, read_kwargs)
+    valid, _ = is_cache_valid(file_path, meta_path)
+    if valid and os.path.exists(arrow_path):
+        try:
+            return read_arrow(arrow_path)
+        except (OSError, pa.ArrowInvalid) as e:
+            print(f"Discarding unreadable cache for {file_path}: {e}")
+
+    with span('pandas.read_excel', path=str(file_path)):
+        df = pd.read_excel(file_path, **read_kwargs)
+    if isinstance(df, pd.DataFrame):
+        write_cache(df, file_path, arrow_path, meta_path)
+    return df
+
+
+def clear_cache():
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(('.arrow', '.json', '.tmp')):
+            os.remove(os.path.join(CACHE_DIR, name))
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Per-source dtype profiles applied by the loaders. Repetitive text columns become
+# 'category'. Count columns are downcast to the smallest signed integer type that holds
+# their values, and columns with missing or fractional values stay as they are. Ratio
+# columns (CTR, Position) become float32. Money columns are left float64.
+# Columns a profile names but the frame lacks are skipped, and so are the columns passed as
+# keep (e.g. the numeric columns the correlation composite keys are built from).
+PROFILES = {
+    'seo_queries': {
+        'category': ['Top queries'],
+        'integer': ['Clicks', 'Impressions'],
+        'float32': ['CTR', 'Position'],
+    },
+    'seo_pages': {
+        'category': ['Page'],
+        'integer': ['Clicks', 'Impressions'],
+        'float32': ['CTR', 'Position'],
+    },
+    'traffic': {
+        'category': ['Item name'],
+        'integer': ['Items viewed', 'Items added to cart', 'Items purchased'],
+    },
+    'items_catalog': {
+        'category': ['item_product_group'],
+    },
+    'leads': {
+        'category': ['Products Requested'],
+    },
+}
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def apply_profile(df, source, report=False, keep=()):
+    # converts the profiled columns in place and returns the frame, report=True prints its memory before and after
+    profile = PROFILES[source]
+    before = memory_mb(df) if report else None
+
+    for col in profile.get('category', []):
+        if col in df and col not in keep and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    for col in profile.get('integer', []):
+        if col in df and col not in keep and pd.api.types.is_numeric_dtype(df[col]) and not df[col].hasnans:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in profile.get('float32', []):
+        if col in df and col not in keep and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype(np.float32)
+
+    if report:
+        print(f"{source}: {before:.1f} MB -> {memory_mb(df):.1f} MB")
+    return df
+
+
+def factorize_sorted(values):
+    # pd.factorize(values, sort=True) with plain uniques. Categorical columns reuse their codes
+    # instead of hashing every row again, unobserved categories are dropped.
+    if isinstance(values.dtype, pd.CategoricalDtype) and values.cat.categories.is_monotonic_increasing:
+        codes = values.cat.codes.to_numpy()
+        categories = values.cat.categories
+        present = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+        remap = np.cumsum(present) - 1
+        return np.where(codes >= 0, remap[codes], -1), categories[present]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return pd.factorize(values, sort=True)
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from dtypeprofiles import factorize_sorted
+
+# Per-item revenue forecasting. The rows are reduced (read-only, the frame is not copied or
+# changed) to a dense groups x months panel of totals, then every group gets its own linear
+# model revenue ~ 1 + t + features, fitted together as one stacked least-squares problem:
+# the normal equations of all groups form a (groups, p, p) array solved in one batched call.
+# Future months use each group's average monthly features.
+
+DEFAULT_FEATURES = ('Items viewed', 'Items added to cart', 'Items purchased')
+
+
+class MonthlyPanel:
+    def __init__(self, df, group_column='Item name', date_column='Mon-Year', columns=()):
+        group_codes, self.groups = factorize_sorted(df[group_column])
+        dates = df[date_column]
+        ordinals = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.float64)
+        valid = (group_codes >= 0) & ~np.isnan(ordinals)
+        if not valid.any():
+            raise ValueError(f"No rows with both {group_column} and {date_column}")
+
+        first = int(ordinals[valid].min())
+        self.n_months = int(ordinals[valid].max()) - first + 1
+        self.months = pd.date_range(pd.Timestamp(year=first // 12, month=first % 12 + 1, day=1),
+                                    periods=self.n_months, freq='MS')
+
+        shape = (len(self.groups), self.n_months)
+        cells = group_codes[valid].astype(np.int64) * self.n_months + (ordinals[valid].astype(np.int64) - first)
+        self.row_counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        self.totals = {
+            col: np.bincount(cells, weights=np.nan_to_num(df[col].to_numpy(dtype=np.float64)[valid]),
+                             minlength=shape[0] * shape[1]).reshape(shape)
+            for col in columns
+        }
+        # a group-month counts as observed when it has rows, unobserved cells get zero weight
+        self.observed = self.row_counts > 0
+
+
+def design_matrix(t, features):
+    # t: (months,), features: (groups, months, k) -> (groups, months, 2 + k)
+    n_groups, n_months = features.shape[:2]
+    intercept = np.ones((n_groups, n_months, 1))
+    trend = np.broadcast_to(t[None, :, None], (n_groups, n_months, 1))
+    return np.concatenate([intercept, trend, features], axis=2)
+
+
+def fit_batched(X, y, weights):
+    # weighted least squares for every group at once, pinv covers groups with too few months
+    XtW = X.transpose(0, 2, 1) * weights[:, None, :]
+    coefs = np.einsum('gpq,gq->gp', np.linalg.pinv(XtW @ X), np.einsum('gpt,gt->gp', XtW, y))
+    coefs[weights.sum(axis=1) == 0] = np.nan
+    return coefs
+
+
+class RevenueForecaster:
+    def __init__(self, features=DEFAULT_FEATURES, target='Item revenue', group_column='Item name',
+                 date_column='Mon-Year'):
+        self.features = list(features)
+        self.target = target
+        self.group_column = group_column
+        self.date_column = date_column
+
+    def fit(self, df=None, panel=None, until=None):
+        # fits on the panel's months [0, until), a panel can be passed to skip re-reading the rows
+        self.panel = panel or MonthlyPanel(df, self.group_column, self.date_column, self.features + [self.target])
+        self.until = self.panel.n_months if until is None else until
+        weights = self.panel.observed[:, :self.until].astype(np.float64)
+        features = np.stack([self.panel.totals[col][:, :self.until] for col in self.features], axis=2)
+
+        # trend is centered on the fitted months for conditioning
+        self.t_offset = (self.until - 1) / 2
+        t = np.arange(self.until) - self.t_offset
+        y = self.panel.totals[self.target][:, :self.until]
+        self.coefs = fit_batched(design_matrix(t, features), y, weights)
+
+        # average monthly features over each group's observed months, used for future months
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.future_features = (features * weights[:, :, None]).sum(axis=1) / weights.sum(axis=1)[:, None]
+        return self
+
+    def predict(self, horizon):
+        # (groups, horizon) forecasts for the months after the fitted range, clipped at zero
+        t = np.arange(self.until, self.until + horizon) - self.t_offset
+        features = np.repeat(self.future_features[:, None, :], horizon, axis=1)
+        predictions = np.einsum('gtp,gp->gt', design_matrix(t, features), self.coefs)
+        return np.clip(predictions, 0, None)
+
+    def forecast(self, horizon):
+        # long frame: group, Mon-Year, predicted revenue (groups without history are left out)
+        predictions = self.predict(horizon)
+        months = pd.date_range(self.panel.months[0], periods=self.until + horizon, freq='MS')[self.until:]
+        fitted = ~np.isnan(self.coefs).any(axis=1)
+        return pd.DataFrame({
+            self.group_column: np.repeat(np.asarray(self.panel.groups)[fitted], horizon),
+            self.date_column: np.tile(months, fitted.sum()),
+            'Predicted revenue': predictions[fitted].ravel(),
+        })
+
+
+def backtest(df=None, holdout=2, panel=None, **forecaster_options):
+    # refit without the last `holdout` months, forecast them and compare with the actuals.
+    # returns (per group errors, overall metrics on the summed monthly revenue)
+    forecaster = RevenueForecaster(**forecaster_options)
+    panel = panel or MonthlyPanel(df, forecaster.group_column, forecaster.date_column,
+                                  forecaster.features + [forecaster.target])
+    if panel.n_months <= holdout:
+        raise ValueError(f"Need more than {holdout} months of data to backtest")
+
+    until = panel.n_months - holdout
+    forecaster.fit(panel=panel, until=until)
+    predicted = forecaster.predict(holdout)
+    actual = panel.totals[forecaster.target][:, until:]
+    observed = panel.observed[:, until:]
+    fitted = ~np.isnan(forecaster.coefs).any(axis=1)
+    scored = observed & fitted[:, None]
+
+    errors = np.where(scored, predicted - actual, 0.0)
+    n_scored = scored.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        per_group = pd.DataFrame({
+            forecaster.group_column: np.asarray(panel.groups),
+            'months': n_scored,
+            'mae': np.abs(errors).sum(axis=1) / n_scored,
+            'rmse': np.sqrt((errors ** 2).sum(axis=1) / n_scored),
+        })
+    per_group = per_group[per_group['months'] > 0].reset_index(drop=True)
+
+    total_actual = np.where(scored, actual, 0.0).sum(axis=0)
+    total_predicted = np.where(scored, predicted, 0.0).sum(axis=0)
+    total_errors = total_predicted - total_actual
+    nonzero = total_actual != 0
+    mape = np.mean(np.abs(total_errors[nonzero]) / np.abs(total_actual[nonzero])) if nonzero.any() else np.nan
+    overall = {
+        'holdout_months': holdout,
+        'groups': int((n_scored > 0).sum()),
+        'mae': float(np.abs(total_errors).mean()),
+        'rmse': float(np.sqrt((total_errors ** 2).mean())),
+        'mape': float(mape),
+    }
+    return per_group, overall
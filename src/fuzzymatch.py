@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Approximate matching of product descriptions across sources with character n-gram TF-IDF.
+# Descriptions are deduplicated first and candidates come from a sparse product of the
+# two TF-IDF matrices, so only pairs that share n-grams are ever scored. N-grams present
+# in most descriptions are dropped (max_df) since they link almost every pair.
+
+
+class DescriptionMatcher:
+    def __init__(self, ngram_range=(3, 3), max_df=0.5, chunk_size=2000):
+        self.ngram_range = ngram_range
+        self.max_df = max_df
+        self.chunk_size = chunk_size
+        self.vectorizer = None
+        self.right_keys = None
+        self.right_matrix = None
+
+    @staticmethod
+    def unique_descriptions(descriptions):
+        keys = pd.Series(descriptions).dropna().astype(str).str.strip().str.lower()
+        keys = keys[~keys.isin(['', 'nan', 'none'])]
+        return pd.unique(keys)
+
+    def fit(self, right_descriptions, left_descriptions=None):
+        # index the side we match against, the vocabulary covers both sides when given
+        self.right_keys = self.unique_descriptions(right_descriptions)
+        corpus = self.right_keys
+        if left_descriptions is not None:
+            corpus = np.concatenate([corpus, self.unique_descriptions(left_descriptions)])
+
+        self.vectorizer = TfidfVectorizer(
+            analyzer='char_wb', ngram_range=self.ngram_range, max_df=self.max_df,
+            lowercase=False, dtype=np.float32
+        )
+        self.vectorizer.fit(corpus)
+        self.right_matrix = self.vectorizer.transform(self.right_keys).T.tocsr()
+        return self
+
+    def match(self, left_descriptions, top_k=3, min_score=0.5):
+        if self.vectorizer is None:
+            raise ValueError("DescriptionMatcher.fit must be called before match")
+
+        left_keys = self.unique_descriptions(left_descriptions)
+        matches = []
+        for start in range(0, len(left_keys), self.chunk_size):
+            chunk_keys = left_keys[start:start + self.chunk_size]
+            scores = (self.vectorizer.transform(chunk_keys) @ self.right_matrix).tocoo()
+            keep = scores.data >= min_score
+            rows, cols, data = scores.row[keep], scores.col[keep], scores.data[keep]
+
+            # best top_k candidates per left description
+            order = np.lexsort((-data, rows))
+            rows, cols, data = rows[order], cols[order], data[order]
+            first_in_row = np.r_[0, np.flatnonzero(np.diff(rows)) + 1]
+            rank = np.arange(len(rows)) - np.repeat(first_in_row, np.diff(np.r_[first_in_row, len(rows)]))
+            keep = rank < top_k
+
+            matches.append(pd.DataFrame({
+                'left_description': chunk_keys[rows[keep]],
+                'right_description': self.right_keys[cols[keep]],
+                'score': data[keep],
+                'rank': rank[keep] + 1,
+            }))
+
+        if not matches:
+            return pd.DataFrame(columns=['left_description', 'right_description', 'score', 'rank'])
+        return pd.concat(matches, ignore_index=True)
+
+
+def match_descriptions(left_descriptions, right_descriptions, top_k=3, min_score=0.5, **matcher_options):
+    matcher = DescriptionMatcher(**matcher_options).fit(right_descriptions, left_descriptions)
+    return matcher.match(left_descriptions, top_k=top_k, min_score=min_score)
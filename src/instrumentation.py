@@ -0,0 +1,173 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Timing spans for the loaders, aggregations and rendering. Tracing is off unless
+# ANALYSIS_TRACE is set: to 1 for .traces/, or to a directory. When off, @traced returns
+# the function unchanged and span() is a shared no-op context. When on, each process writes
+# <dir>/trace_<time>_<pid>.json at exit in Chrome Trace Event format, to open in
+# chrome://tracing, https://ui.perfetto.dev or speedscope as a timeline/flame chart. Pool
+# workers never run atexit, so batch jobs call flush() when they finish. Every span records
+# its duration, rows in/out where a DataFrame is involved, and the tracemalloc peak above the
+# memory at span start. tracemalloc counts the whole process: a span that starts or ends
+# while another thread has a span open gets memory_shared, its peak includes that thread's
+# allocations, and the peak counter is not reset under the other thread. Set
+# ANALYSIS_TRACE_MEMORY=0 to skip tracemalloc, which slows allocation heavy code down noticeably.
+TRACE_SETTING = os.environ.get('ANALYSIS_TRACE', '')
+ENABLED = TRACE_SETTING not in ('', '0')
+TRACE_DIR = '.traces' if TRACE_SETTING in ('1', 'true') else TRACE_SETTING
+TRACK_MEMORY = ENABLED and os.environ.get('ANALYSIS_TRACE_MEMORY', '1') != '0'
+
+NULL_SPAN = nullcontext()
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter()
+        # open span depth per thread, for the memory_shared check
+        self.open_spans = {}
+        self.files_written = 0
+
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name, **args):
+        stack = self.stack()
+        frame = {'args': dict(args), 'peak': 0}
+        if TRACK_MEMORY:
+            thread_id = threading.get_ident()
+            with self.lock:
+                shared = self.other_spans_open(thread_id)
+                self.open_spans[thread_id] = self.open_spans.get(thread_id, 0) + 1
+                current, peak = tracemalloc.get_traced_memory()
+                # the parent keeps the peak reached so far, the counter restarts for this span.
+                # resetting under another thread's open span would lose that span's peak
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+                if shared:
+                    frame['args']['memory_shared'] = True
+                else:
+                    tracemalloc.reset_peak()
+            frame['start_memory'] = current
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame['args']
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            if TRACK_MEMORY:
+                with self.lock:
+                    self.open_spans[thread_id] -= 1
+                    if self.other_spans_open(thread_id):
+                        frame['args']['memory_shared'] = True
+                    peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                frame['args']['peak_mb'] = round((peak - frame['start_memory']) / 2**20, 3)
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            event = {
+                'name': name, 'ph': 'X', 'cat': name.split('.')[0],
+                'ts': round((start - self.origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1),
+                'pid': os.getpid(), 'tid': threading.get_ident(), 'args': frame['args'],
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def other_spans_open(self, thread_id):
+        return any(depth for other, depth in self.open_spans.items() if other != thread_id)
+
+    def summary(self, events=None):
+        totals = {}
+        for event in self.events if events is None else events:
+            entry = totals.setdefault(event['name'], [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event['dur'] / 1e3
+            entry[2] = max(entry[2], event['args'].get('peak_mb', 0.0))
+        lines = [f"{'span':<64} {'calls':>6} {'total ms':>10} {'peak MB':>9}"]
+        for name, (calls, total_ms, peak_mb) in sorted(totals.items(), key=lambda item: -item[1][1])[:25]:
+            lines.append(f"{name:<64} {calls:>6} {total_ms:>10.1f} {peak_mb:>9.1f}")
+        return '\n'.join(lines)
+
+    def write(self):
+        # writes the events recorded since the last write, one file per call
+        with self.lock:
+            events, self.events = self.events, []
+        if not events:
+            return None
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        self.files_written += 1
+        path = os.path.join(TRACE_DIR, f"trace_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{self.files_written}.json")
+        with open(path, 'w') as f:
+            json.dump({
+                'traceEvents': events,
+                'displayTimeUnit': 'ms',
+                'otherData': {'argv': sys.argv, 'memory': TRACK_MEMORY},
+            }, f)
+        print(f"{self.summary(events)}\ntrace written to {path}", file=sys.stderr)
+        return path
+
+
+tracer = Tracer() if ENABLED else None
+if ENABLED:
+    if TRACK_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    atexit.register(tracer.write)
+
+
+def span(name, **args):
+    # with span('seodashboard.tight_layout'): ...
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, **args)
+
+
+def flush():
+    # writes the trace so far, for processes that exit without atexit (ProcessPoolExecutor workers)
+    if tracer is None:
+        return None
+    return tracer.write()
+
+
+def row_count(value):
+    if hasattr(value, 'shape') and hasattr(value, 'index'):
+        return len(value)
+    if isinstance(value, tuple):
+        counts = [row_count(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def traced(func=None, name=None):
+    # @traced or @traced(name='...'), a no-op unless ANALYSIS_TRACE is set
+    if func is None:
+        return functools.partial(traced, name=name)
+    if not ENABLED:
+        return func
+
+    span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with tracer.span(span_name) as span_args:
+            rows_in = next((row_count(arg) for arg in args if row_count(arg) is not None), None)
+            if rows_in is not None:
+                span_args['rows_in'] = rows_in
+            result = func(*args, **kwargs)
+            rows_out = row_count(result)
+            if rows_out is not None:
+                span_args['rows_out'] = rows_out
+            return result
+    return wrapper
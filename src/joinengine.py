@@ -0,0 +1,112 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+# Cross-source join on normalized keys. Every source's keys are factorized against one
+# shared vocabulary, so each pairwise match is a linear pass over per-key counts instead
+# of a merge between the two frames. Sources join on key_column unless key_columns names
+# another column for them (the items catalog is identified by item number, not description).
+
+MISSING_KEYS = {'', 'nan', 'none', '<na>'}
+
+
+def normalize_keys(keys):
+    normalized = keys.astype(str).str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+    return normalized.mask(normalized.isin(MISSING_KEYS))
+
+
+class KeyIndex:
+    # codes -> row positions as a CSR-style index: rows order[starts[c]:starts[c + 1]] hold code c
+    def __init__(self, codes, vocabulary_size):
+        self.codes = codes
+        valid = codes >= 0
+        self.counts = np.bincount(codes[valid], minlength=vocabulary_size)
+        self.order = np.flatnonzero(valid)[np.argsort(codes[valid], kind='stable')]
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)))
+
+    @property
+    def unique_keys(self):
+        return int(np.count_nonzero(self.counts))
+
+    def rows_for(self, code):
+        return self.order[self.starts[code]:self.starts[code + 1]]
+
+    def rows_matching(self, present):
+        # all rows whose key is flagged in the boolean vocabulary mask
+        valid = self.codes >= 0
+        mask = np.zeros(len(self.codes), dtype=bool)
+        mask[valid] = present[self.codes[valid]]
+        return np.flatnonzero(mask)
+
+
+class CrossSourceJoin:
+    def __init__(self, sources, key_column='description_key', key_columns=None):
+        self.key_column = key_column
+        self.key_columns = {name: (key_columns or {}).get(name, key_column) for name in sources}
+        self.sources = {
+            name: df for name, df in sources.items() if self.key_columns[name] in df.columns
+        }
+
+        normalized = {name: normalize_keys(df[self.key_columns[name]]) for name, df in self.sources.items()}
+        if normalized:
+            all_keys = pd.concat(list(normalized.values()), ignore_index=True)
+            all_codes, self.vocabulary = pd.factorize(all_keys)
+        else:
+            all_codes, self.vocabulary = np.empty(0, dtype=np.int64), pd.Index([])
+
+        self.indexes = {}
+        offset = 0
+        for name, keys in normalized.items():
+            codes = all_codes[offset:offset + len(keys)]
+            offset += len(keys)
+            self.indexes[name] = KeyIndex(codes, len(self.vocabulary))
+
+    def shared_keys(self, left, right):
+        return (self.indexes[left].counts > 0) & (self.indexes[right].counts > 0)
+
+    def match(self, left, right):
+        left_index, right_index = self.indexes[left], self.indexes[right]
+        shared = self.shared_keys(left, right)
+        shared_count = int(np.count_nonzero(shared))
+        smaller = min(left_index.unique_keys, right_index.unique_keys)
+        union = left_index.unique_keys + right_index.unique_keys - shared_count
+
+        return {
+            'left': left,
+            'right': right,
+            'shared_keys': shared_count,
+            'matched_rows_left': int(left_index.counts[shared].sum()),
+            'matched_rows_right': int(right_index.counts[shared].sum()),
+            'match_pairs': int((left_index.counts[shared] * right_index.counts[shared]).sum()),
+            'overlap_ratio': shared_count / smaller if smaller else 0.0,
+            'jaccard': shared_count / union if union else 0.0,
+        }
+
+    def pairwise_matches(self):
+        return [self.match(left, right) for left, right in itertools.combinations(self.indexes, 2)]
+
+    def summary(self):
+        return pd.DataFrame(self.pairwise_matches(), columns=[
+            'left', 'right', 'shared_keys', 'matched_rows_left', 'matched_rows_right',
+            'match_pairs', 'overlap_ratio', 'jaccard'
+        ])
+
+    def matched_positions(self, left, right):
+        shared = self.shared_keys(left, right)
+        return self.indexes[left].rows_matching(shared), self.indexes[right].rows_matching(shared)
+
+    def matched_rows(self, left, right):
+        left_rows, right_rows = self.matched_positions(left, right)
+        return self.sources[left].iloc[left_rows], self.sources[right].iloc[right_rows]
+
+    def matched_pairs(self, left, right, suffixes=None):
+        # joined rows for every shared key, only the matching rows take part in the merge
+        left_rows, right_rows = self.matched_positions(left, right)
+        suffixes = suffixes or (f" ({left})", f" ({right})")
+        left_frame = self.sources[left].iloc[left_rows].reset_index(drop=True)
+        left_frame['_key_code'] = self.indexes[left].codes[left_rows]
+        right_frame = self.sources[right].iloc[right_rows].reset_index(drop=True)
+        right_frame['_key_code'] = self.indexes[right].codes[right_rows]
+        joined = left_frame.merge(right_frame, on='_key_code', suffixes=suffixes)
+        joined.insert(0, 'match_key', self.vocabulary[joined['_key_code'].to_numpy()])
+        return joined.drop(columns='_key_code')
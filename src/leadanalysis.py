@@ -1,9 +1,24 @@
+import os
 import pandas as pd
 import re
-import sqlite3
+import numpy as np
 import matplotlib.pyplot as plt
-import tkinter as tk
-from tkinter import filedialog, messagebox
+from datacache import read_excel_cached
+from dtypeprofiles import apply_profile
+from analyticsstore import save_to_store
+from taskrunner import run_task
+from plotting import save_or_show
+from instrumentation import traced
+from ranking import TopK, top_rows
+
+PRODUCT_PATTERN = re.compile(r'(?:Product:|Item Number:)\s*([\w-]+)', re.IGNORECASE)
+FIRST_WORD_PATTERN = re.compile(r'[\w-]+')
+#FIRST_WORD_PATTERN.match as a search with one group, for Series.str.extract
+LEADING_WORD_PATTERN = re.compile(r'^([\w-]+)')
+
+# lead files bigger than this are counted in chunks by compute_product_counts
+STREAM_THRESHOLD_BYTES = 50 * 1024 * 1024
+CLEANED_CSV_PATH = 'cleaned_product_counts.csv'
 
 #https://docs.python.org/3/library/tk.html
 def extract_product_id(row):
@@ -12,64 +27,169 @@ def extract_product_id(row):
         return None
     
     # Product: or Item Number:
-    product_match = re.search(r'(?:Product:|Item Number:)\s*([\w-]+)', row, re.IGNORECASE)
+    product_match = PRODUCT_PATTERN.search(row)
     if product_match:
         return product_match.group(1)
     # take the first word
-    first_word_match = re.match(r'[\w-]+', row.strip())
+    first_word_match = FIRST_WORD_PATTERN.match(row.strip())
     if first_word_match:
         return first_word_match.group(0)
     return None
 
-def process_files():
-    item_file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
-    if not item_file_path:
-        return
-    product_request_file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
-    if not product_request_file_path:
-        return
+def extract_product_ids(requests):
+    #vectorized extract_product_id with the precompiled patterns: Series.str.extract for the
+    #Product:/Item Number: id, else the first word of the stripped text, None for quoted requests.
+    #the column is factorized first so each distinct request is matched once (lead exports repeat
+    #the same requests a lot), then the ids are gathered back by code. non-string cells give None
+    codes, uniques = pd.factorize(requests)
+    texts = pd.Series(uniques, dtype=object)
+    stripped = texts.str.strip()
+    product_ids = texts.str.extract(PRODUCT_PATTERN, expand=False)
+    product_ids = product_ids.fillna(stripped.str.extract(LEADING_WORD_PATTERN, expand=False))
+    product_ids[stripped.str.startswith('"', na=True)] = np.nan
+    unique_ids = np.append(product_ids.astype(object).where(product_ids.notna(), None).to_numpy(), None)
+    return pd.Series(unique_ids[codes], index=requests.index, name=requests.name)
 
-    try:
-        product_data = pd.read_excel(product_request_file_path)
-        items = pd.read_excel(item_file_path)
+def iter_product_ids(requests, chunk_size=500_000):
+    #streaming mode, extracts in fixed size slices so temporaries stay bounded
+    for start in range(0, len(requests), chunk_size):
+        yield extract_product_ids(requests.iloc[start:start + chunk_size])
+
+def read_request_chunks(file_path, chunk_size=100_000, column='Products Requested'):
+    #yields the request column in row chunks without loading the whole file
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        for chunk in pd.read_csv(file_path, usecols=[column], chunksize=chunk_size):
+            yield chunk[column]
+    elif extension == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=[column]):
+            yield batch.column(0).to_pandas()
+    else:
+        #openpyxl read-only mode streams the sheet xml row by row
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            #first sheet, the one pd.read_excel reads by default (not whichever sheet was saved as active)
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, ())
+            if column not in header:
+                raise KeyError(column)
+            position = header.index(column)
+            values = []
+            for row in rows:
+                values.append(row[position] if position < len(row) else None)
+                if len(values) >= chunk_size:
+                    yield pd.Series(values, dtype=object, name=column)
+                    values = []
+            if values:
+                yield pd.Series(values, dtype=object, name=column)
+        finally:
+            workbook.close()
+
+@traced
+def count_product_ids(product_ids):
+    #counting occurence of different product in product
+    product_counts = product_ids.dropna().value_counts().reset_index()
+    product_counts.columns = ['Product ID', 'Count']
+    return product_counts
+
+@traced
+def stream_product_counts(file_path, chunk_size=100_000, progress=None):
+    #running totals over per-chunk counts, memory only grows with the number of distinct ids.
+    #the current top 10 is kept up to date per chunk for the progress message
+    running_counts = TopK(10)
+    rows_read = 0
+    for requests in read_request_chunks(file_path, chunk_size):
+        running_counts.update(extract_product_ids(requests).dropna().value_counts(sort=False).to_dict())
+        rows_read += len(requests)
+        if progress:
+            leader = running_counts.items()[:1]
+            progress(f"Counted {rows_read:,} lead rows" + (f", most requested so far: {leader[0][0]}" if leader else ""))
+
+    #totals keep first-seen order like value_counts, so the same sort gives the same tie order
+    counts = pd.Series(running_counts.totals, dtype='int64').sort_values(ascending=False)
+    product_counts = counts.reset_index()
+    product_counts.columns = ['Product ID', 'Count']
+    return product_counts
 
+@traced
+def clean_product_counts(product_counts, items):
+    valid_ids = set(items['item_number'])
+    return product_counts[
+        (product_counts['Product ID'].isin(valid_ids)) | (product_counts['Count'] > 7)
+    ]
 
-        product_data['Product ID'] = product_data['Products Requested'].apply(extract_product_id)
+@traced
+def compute_product_counts(product_request_file_path, item_file_path, stream=None, progress=None):
+    #stream large lead files in chunks instead of reading the whole workbook
+    if stream is None:
+        stream = os.path.getsize(product_request_file_path) > STREAM_THRESHOLD_BYTES
+    if progress:
+        progress("Loading items catalog...")
+    items = apply_profile(read_excel_cached(item_file_path), 'items_catalog')
+
+    if stream:
+        product_counts = stream_product_counts(product_request_file_path, progress=progress)
+    else:
+        if progress:
+            progress("Loading product requests...")
+        product_data = apply_profile(read_excel_cached(product_request_file_path), 'leads')
+        product_data['Product ID'] = extract_product_ids(product_data['Products Requested'])
         cleaned_product_data = product_data[~product_data['Product ID'].isin(['-'])]
 
         #if none then remove the data
         cleaned_product_data = product_data.dropna(subset=['Product ID'])
+        product_counts = count_product_ids(cleaned_product_data['Product ID'])
+
+    return clean_product_counts(product_counts, items)
+
+@traced
+def plot_top_products(cleaned_product_counts, output=None):
+    #top 10 bar chart data
+    top_10_products = top_rows(cleaned_product_counts, 'Count', 10)
+    fig = plt.figure(figsize=(10, 6))
+    plt.bar(top_10_products['Product ID'], top_10_products['Count'], color='skyblue', edgecolor='black')
+    plt.title('Top 10 Products by Lead', fontsize=14)
+    plt.xlabel('Product ID', fontsize=12)
+    plt.ylabel('Count', fontsize=12)
+    plt.xticks(rotation=45, fontsize=10)
+    plt.tight_layout()
+    save_or_show(fig, output)
+
+@traced
+def update_product_counts(product_request_file_path, item_file_path, progress=None):
+    #counts and writes the csv and database files read back by the traffic dashboard, no Tk calls
+    cleaned_product_counts = compute_product_counts(product_request_file_path, item_file_path, progress=progress)
+    if progress:
+        progress("Saving product counts...")
+    cleaned_product_counts.to_csv(CLEANED_CSV_PATH, index=False)
+    save_to_store('product_counts', cleaned_product_counts, replace=True)
+    return cleaned_product_counts
 
-        #counting occurence of different product in product
-        product_counts = cleaned_product_data['Product ID'].value_counts().reset_index()
-        product_counts.columns = ['Product ID', 'Count']
-        
-
-        valid_ids = set(items['item_number'])
-        cleaned_product_counts = product_counts[
-            (product_counts['Product ID'].isin(valid_ids)) | (product_counts['Count'] > 7)
-        ]
-
-        #csv and database files
-        # cleaned_csv_path = 'cleaned_product_counts.csv'
-        # cleaned_product_counts.to_csv(cleaned_csv_path, index=False)
-        # db_path = 'mydb.db'
-        # conn = sqlite3.connect(db_path)
-        # cleaned_product_counts.to_sql('cleaned_product_counts', conn, if_exists='replace', index=False)
-        # conn.commit()
-        # conn.close()
-
-        #top 10 bar chart data
-        top_10_products = cleaned_product_counts.nlargest(10, 'Count')
-        plt.figure(figsize=(10, 6))
-        plt.bar(top_10_products['Product ID'], top_10_products['Count'], color='skyblue', edgecolor='black')
-        plt.title('Top 10 Products by Lead', fontsize=14)
-        plt.xlabel('Product ID', fontsize=12)
-        plt.ylabel('Count', fontsize=12)
-        plt.xticks(rotation=45, fontsize=10)
-        plt.tight_layout()
-        plt.show()
+def show_product_counts(cleaned_product_counts):
+    from tkinter import messagebox
+    try:
+        plot_top_products(cleaned_product_counts)
         messagebox.showinfo("Success", "Done")
 
     except Exception as e:
         messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+def process_files(root=None):
+    #tkinter is only imported by the dialogs so batch runs can load this module headless
+    from tkinter import filedialog, messagebox
+    item_file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+    if not item_file_path:
+        return
+    product_request_file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
+    if not product_request_file_path:
+        return
+
+    #counting and saving run on a worker thread when a Tk root is given, the chart is drawn back on the UI thread
+    run_task(
+        root, update_product_counts, product_request_file_path, item_file_path,
+        on_done=show_product_counts,
+        on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {str(e)}"),
+        title="Counting product leads..."
+    )
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Asynchronous LLM client for the correlation analysis. Prompts are sent concurrently
+# (bounded by a semaphore), transient failures are retried with exponential backoff,
+# and every response is cached on disk under a hash of backend, model, parameters and
+# prompt, so repeat runs don't call the backend again.
+#
+# Backends: 'openai' (OPENAI_API_KEY), 'http' (any server speaking the stub protocol,
+# LLM_BACKEND_URL) and 'stub' (deterministic, in process). For offline runs start the stub
+# server with `python llmclient.py serve-stub --port 8765` and use LLM_BACKEND=http.
+LLM_CACHE_DIR = os.environ.get('LLM_CACHE_DIR', '.llmcache')
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'openai')
+LLM_BACKEND_URL = os.environ.get('LLM_BACKEND_URL', 'http://127.0.0.1:8765')
+DEFAULT_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+
+# openai exception class names worth retrying, across the 0.x and 1.x SDKs
+RETRYABLE_OPENAI_ERRORS = {
+    'RateLimitError', 'APIConnectionError', 'APITimeoutError', 'Timeout',
+    'ServiceUnavailableError', 'InternalServerError', 'TryAgain',
+}
+
+
+class RetryableError(Exception):
+    pass
+
+
+class OpenAIBackend:
+    name = 'openai'
+
+    def __init__(self, api_key=None, model=DEFAULT_MODEL):
+        import openai
+
+        self.model = model
+        self.api_key = api_key or os.environ.get('OPENAI_API_KEY', '')
+        if hasattr(openai, 'AsyncOpenAI'):
+            self.client = openai.AsyncOpenAI(api_key=self.api_key)
+            self.legacy = None
+        else:
+            self.client = None
+            self.legacy = openai
+
+    async def complete(self, prompt, max_tokens=1024, temperature=0.5):
+        messages = [{"role": "user", "content": prompt}]
+        try:
+            if self.client is not None:
+                response = await self.client.chat.completions.create(
+                    model=self.model, messages=messages, max_tokens=max_tokens, temperature=temperature)
+                return response.choices[0].message.content
+            response = await self.legacy.ChatCompletion.acreate(
+                model=self.model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                api_key=self.api_key)
+            return response.choices[0].message.content
+        except Exception as e:
+            if type(e).__name__ in RETRYABLE_OPENAI_ERRORS:
+                raise RetryableError(str(e)) from e
+            raise
+
+
+class HTTPBackend:
+    # POST {"model", "prompt", "max_tokens", "temperature"} to <url>/complete, reply {"text": ...}
+    name = 'http'
+
+    def __init__(self, url=LLM_BACKEND_URL, model='stub', timeout=60):
+        self.url = url.rstrip('/') + '/complete'
+        self.model = model
+        self.timeout = timeout
+
+    def post(self, payload):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))['text']
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                raise RetryableError(f"HTTP {e.code} from {self.url}") from e
+            raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+            raise RetryableError(f"{self.url}: {e}") from e
+
+    async def complete(self, prompt, max_tokens=1024, temperature=0.5):
+        payload = {'model': self.model, 'prompt': prompt, 'max_tokens': max_tokens, 'temperature': temperature}
+        return await asyncio.to_thread(self.post, payload)
+
+
+def stub_completion(prompt, max_tokens=1024):
+    # same prompt, same answer: a short summary derived from the prompt hash
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    words = prompt.split()
+    text = f"[stub {digest[:12]}] Analysis of {len(words)} word prompt: {' '.join(words[:12])}..."
+    return text[:max_tokens * 4]
+
+
+class StubBackend:
+    name = 'stub'
+
+    def __init__(self, model='stub', delay=0.0):
+        self.model = model
+        self.delay = delay
+
+    async def complete(self, prompt, max_tokens=1024, temperature=0.5):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return stub_completion(prompt, max_tokens)
+
+
+def make_backend(name=None, api_key=None, model=None):
+    name = name or LLM_BACKEND
+    if name == 'openai':
+        return OpenAIBackend(api_key=api_key, model=model or DEFAULT_MODEL)
+    if name == 'http':
+        return HTTPBackend(model=model or 'stub')
+    if name == 'stub':
+        return StubBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+class ResponseCache:
+    def __init__(self, directory=LLM_CACHE_DIR):
+        self.directory = directory
+
+    def key(self, backend, prompt, params):
+        identity = json.dumps({'backend': backend.name, 'model': backend.model, 'params': params,
+                               'prompt': prompt}, sort_keys=True)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        try:
+            with open(self.path(key), encoding='utf-8') as f:
+                return json.load(f)['text']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, prompt, text):
+        # the response is already in hand, so a failed cache write only costs a repeat call next run
+        path = self.path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # unique temp file per writer, concurrent runs caching the same prompt don't share it
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'prompt': prompt, 'text': text}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"Could not write LLM cache for {key}: {e}")
+
+
+class AnalysisClient:
+    def __init__(self, backend, cache=None, max_concurrency=4, max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.backend_calls = 0
+
+    async def complete(self, prompt, semaphore, **params):
+        key = self.cache.key(self.backend, prompt, params) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.backend_calls += 1
+                    text = await self.backend.complete(prompt, **params)
+                    break
+                except RetryableError:
+                    if attempt == self.max_retries:
+                        raise
+                    # exponential backoff with full jitter
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                    await asyncio.sleep(random.uniform(0, delay))
+
+        if key:
+            self.cache.put(key, prompt, text)
+        return text
+
+    async def analyze_async(self, prompts, **params):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        names = list(prompts)
+        results = await asyncio.gather(
+            *(self.complete(prompts[name], semaphore, **params) for name in names), return_exceptions=True)
+        return dict(zip(names, results))
+
+    def analyze(self, prompts, **params):
+        # {name: prompt} -> {name: response text or the exception raised for it}
+        return asyncio.run(self.analyze_async(prompts, **params))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8'))
+            body = {'text': stub_completion(payload['prompt'], payload.get('max_tokens', 1024))}
+            status = 200
+        except (ValueError, KeyError) as e:
+            body = {'error': str(e)}
+            status = 400
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub(host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    print(f"Stub LLM backend listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'serve-stub':
+        port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 8765
+        serve_stub(port=port)
+    else:
+        print("usage: python llmclient.py serve-stub [--port 8765]")
@@ -1,11 +1,9 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from trafficanalysis import load_data, perform_analysis
-from leadanalysis import process_files, extract_product_id
-from seoqueriesanalysis import upload_file
-from data_correlation import launch_advanced_data_analysis
-from seodashboard import SEOAnalysisDashboard
-from trafficdashboard import create_dashboard  
+from taskrunner import run_task
+
+# analysis modules (pandas, matplotlib, sklearn, openai...) are imported by the
+# open_* handlers on first use so the main window comes up without loading them
 
 class MainApp:
     def __init__(self, root):
@@ -111,17 +109,23 @@ class MainApp:
         bottom_label.pack(fill="x", padx=20, pady=20)
 
     def open_lead_analysis(self):
-        process_files()
+        from leadanalysis import process_files
+        process_files(self.root)
 
     def open_seo_analysis(self):
-        upload_file()
+        from seoqueriesanalysis import upload_file
+        upload_file(self.root)
 
     def open_traffic_analysis(self):
         file_path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx;*.xls")])
         if not file_path:
             messagebox.showwarning("No File Selected", "Please select a traffic data file.")
             return
-        self.data = load_data(file_path)
+        from trafficanalysis import load_data
+        run_task(self.root, load_data, file_path, on_done=self.on_traffic_loaded, title="Loading traffic data...")
+
+    def on_traffic_loaded(self, data):
+        self.data = data
         if self.data is not None:
             messagebox.showinfo("File Uploaded", "Traffic data uploaded successfully!")
             self.run_traffic_analysis()
@@ -130,16 +134,26 @@ class MainApp:
         if self.data is None:
             messagebox.showerror("No Data", "Please upload traffic data first.")
             return
-        perform_analysis(self.data)
+        #rollups and forecast fits run on a worker thread, only the figure is drawn on the UI thread
+        from trafficanalysis import compute_analysis, perform_analysis
+        data = self.data
+        run_task(
+            self.root, compute_analysis, data,
+            on_done=lambda analysis: perform_analysis(data, analysis=analysis),
+            title="Analyzing traffic data..."
+        )
 
     def open_traffic_dashboard(self):  
-        create_dashboard()
+        from trafficdashboard import create_dashboard
+        create_dashboard(self.root)
 
     def open_seo_dashboard(self):
+        from seodashboard import SEOAnalysisDashboard
         seo_root = tk.Toplevel(self.root)
         app = SEOAnalysisDashboard(seo_root)
 
     def open_data_correlation(self):
+        from data_correlation import launch_advanced_data_analysis
         launch_advanced_data_analysis()
 
 def main():
@@ -0,0 +1,133 @@
+import datetime
+import os
+import pandas as pd
+from analyticsstore import AnalyticsStore
+
+# Append-only monthly ingestion. A dropped-in export is streamed once in openpyxl read-only
+# mode. Rows whose Mon-Year partition is already in the store are skipped, and only the new
+# partitions are summed and written. Partitions are kept per source, the export stream a
+# file belongs to (by default its directory, e.g. exports/east/ and exports/west/), so two
+# regional exports of the same month are both stored. Stored months are never rewritten, so
+# corrections to a past month need a rebuild (rebuild=True) of that source.
+
+# columns are given by header name, or by position where the loader renames them positionally
+MONTHLY_SOURCES = {
+    'traffic': {
+        'table': 'monthly_traffic',
+        'date_column': 'Mon-Year',
+        'date_format': '%b-%Y',
+        'metrics': {
+            'Items added to cart': 'items_added_to_cart',
+            'Items purchased': 'items_purchased',
+            'Item revenue': 'item_revenue',
+        },
+    },
+    'seo_queries': {
+        'table': 'monthly_seo_queries',
+        'date_column': 5,
+        'date_format': '%b-%Y',
+        'metrics': {1: 'clicks', 2: 'impressions'},
+        'names': {'clicks': 'Clicks', 'impressions': 'Impressions'},
+    },
+}
+
+
+def column_position(header, column):
+    if isinstance(column, int):
+        return column
+    if column not in header:
+        raise KeyError(column)
+    return header.index(column)
+
+
+def parse_month(value, date_format):
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return pd.Timestamp(value).normalize()
+    try:
+        return pd.to_datetime(str(value).strip(), format=date_format)
+    except ValueError:
+        return None
+
+
+def default_source(file_path):
+    return os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+
+
+def stored_months(store, table, source):
+    return set(pd.to_datetime(store.query(f"SELECT mon_year FROM {table} WHERE source = ?", (source,))['mon_year']))
+
+
+def scan_new_partitions(file_path, spec, known_months):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        # first sheet, the one pd.read_excel reads by default (not whichever sheet was saved as active)
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        date_position = column_position(header, spec['date_column'])
+        metric_positions = [(column_position(header, column), name) for column, name in spec['metrics'].items()]
+
+        parsed = {}
+        totals = {}
+        for row in rows:
+            raw_month = row[date_position] if date_position < len(row) else None
+            if raw_month not in parsed:
+                parsed[raw_month] = parse_month(raw_month, spec['date_format'])
+            month = parsed[raw_month]
+            if month is None or month in known_months:
+                continue
+
+            month_totals = totals.setdefault(month, dict.fromkeys([name for _, name in metric_positions], 0.0))
+            month_totals['rows'] = month_totals.get('rows', 0) + 1
+            for position, name in metric_positions:
+                value = row[position] if position < len(row) else None
+                if isinstance(value, (int, float)) and not pd.isna(value):
+                    month_totals[name] += value
+    finally:
+        workbook.close()
+
+    if not totals:
+        return pd.DataFrame(columns=['mon_year', 'rows'] + [name for _, name in metric_positions])
+    monthly = pd.DataFrame.from_dict(totals, orient='index')
+    monthly.index.name = 'mon_year'
+    return monthly.reset_index()
+
+
+def ingest_monthly(kind, file_path, source=None, rebuild=False, db_path=None):
+    # returns the Mon-Year partitions that were added for the source
+    spec = MONTHLY_SOURCES[kind]
+    table = spec['table']
+    source = source or default_source(file_path)
+    with AnalyticsStore(db_path) as store:
+        # the workbook is scanned without holding the write lock, the months stored meanwhile by
+        # a concurrent ingest of the same source are dropped below and the insert skips any rest
+        known_months = set() if rebuild else stored_months(store, table, source)
+        new_partitions = scan_new_partitions(file_path, spec, known_months)
+        with store.immediate():
+            if rebuild:
+                store.conn.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+            else:
+                new_partitions = new_partitions[~new_partitions['mon_year'].isin(stored_months(store, table, source))]
+            if len(new_partitions):
+                store.write_rows(table, new_partitions.assign(source=source), update=False)
+    return sorted(new_partitions['mon_year'])
+
+
+def monthly_aggregates(kind, source=None, db_path=None):
+    # stored monthly totals indexed by Mon-Year, with the column names the analyses use.
+    # summed over all sources unless one is given
+    spec = MONTHLY_SOURCES[kind]
+    names = spec.get('names', {name: column for column, name in spec['metrics'].items()})
+    metrics = ['rows'] + list(spec['metrics'].values())
+    where, params = ("WHERE source = ?", (source,)) if source is not None else ("", ())
+    with AnalyticsStore(db_path) as store:
+        monthly = store.query(
+            f"SELECT mon_year, {', '.join(f'SUM({name}) AS {name}' for name in metrics)} "
+            f"FROM {spec['table']} {where} GROUP BY mon_year ORDER BY mon_year",
+            params,
+        )
+    monthly['mon_year'] = pd.to_datetime(monthly['mon_year'])
+    return monthly.set_index('mon_year').rename(columns=names).rename_axis('Mon-Year')
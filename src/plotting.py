@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+from instrumentation import traced
+
+# Shared figure helpers for the analysis modules.
+
+# scatter plots with at least this many points are drawn as a binned density image instead
+DENSITY_MIN_POINTS = int(os.environ.get('PLOT_DENSITY_MIN_POINTS', 50_000))
+DENSITY_BINS = 200
+
+
+@traced
+def save_or_show(fig, output=None):
+    # output is a path or a list of paths (format taken from the extension), None shows the figure
+    if output is None:
+        plt.show()
+        return
+    for path in ([output] if isinstance(output, str) else output):
+        fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+def use_density(n_points, min_points=None):
+    return n_points >= (DENSITY_MIN_POINTS if min_points is None else min_points)
+
+
+def axis_bins(values, bins):
+    lo, hi = values.min(), values.max()
+    if hi <= lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    codes = ((values - lo) * (bins / (hi - lo))).astype(np.int64)
+    np.minimum(codes, bins - 1, out=codes)
+    return codes, (lo, hi)
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    # point counts on a bins x bins grid, one linear pass (no sort/searchsorted like histogram2d)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    if not len(x):
+        return np.zeros((bins, bins)), (0.0, 1.0), (0.0, 1.0)
+    x_codes, x_range = axis_bins(x, bins)
+    y_codes, y_range = axis_bins(y, bins)
+    counts = np.bincount(y_codes * bins + x_codes, minlength=bins * bins).reshape(bins, bins)
+    return counts, x_range, y_range
+
+
+@traced
+def density_plot(ax, x, y, bins=DENSITY_BINS, cmap='viridis'):
+    # drop-in for a large scatter: an image of the grid, so drawing cost does not grow with rows
+    counts, x_range, y_range = density_grid(x, y, bins)
+    image = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower', aspect='auto', interpolation='nearest',
+                      extent=(*x_range, *y_range), cmap=cmap, norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+    ax.figure.colorbar(image, ax=ax, label='Points per bin')
+    return image
@@ -0,0 +1,72 @@
+import heapq
+import numpy as np
+
+# Top-N selection for the ranked charts and tables. top_k finds the k-th best key with one
+# np.partition pass and only sorts the k rows that beat or tie it, instead of sorting every group. Ties keep the
+# earlier position and missing values rank last, so the result is the first k rows of
+# sort_values(kind='stable') and matches nlargest(k, keep='first') / nsmallest(k, keep='first').
+
+
+def stable_order(values, descending=True):
+    # full ranking, the reference top_k agrees with
+    key = np.asarray(values, dtype=np.float64)
+    return np.argsort(-key if descending else key, kind='stable')
+
+
+def top_k(values, k, descending=True):
+    key = np.asarray(values, dtype=np.float64)
+    if descending:
+        key = -key
+    if k >= len(key):
+        return np.argsort(key, kind='stable')
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+
+    # the k-th best key splits the rows into better, tied and worse; only as many tied rows as
+    # fit are kept, lowest positions first. NaN sorts after every number in both numpy calls
+    threshold = np.partition(key, k - 1)[k - 1]
+    if np.isnan(threshold):
+        missing = np.isnan(key)
+        chosen = np.concatenate([np.flatnonzero(~missing), np.flatnonzero(missing)[:k - (~missing).sum()]])
+    else:
+        better = np.flatnonzero(key < threshold)
+        tied = np.flatnonzero(key == threshold)[:k - len(better)]
+        chosen = np.sort(np.concatenate([better, tied]))
+    return chosen[np.argsort(key[chosen], kind='stable')]
+
+
+def top_rows(df, column, k, ascending=False):
+    # df.sort_values(column, ascending=ascending, kind='stable').head(k)
+    return df.iloc[top_k(df[column].to_numpy(dtype=np.float64, na_value=np.nan), k, descending=not ascending)]
+
+
+class TopK:
+    # Running totals per key with the k largest kept current, for counts that arrive in chunks.
+    # Keys rank by total, ties by the order they were first seen (like Counter and value_counts).
+    # While every delta is non-negative, a key outside the previous top can only enter it by
+    # being updated, so each update ranks the previous top plus the updated keys instead of every key.
+    def __init__(self, k):
+        self.k = k
+        self.totals = {}
+        self.first_seen = {}
+        self.top = []
+
+    def rank_key(self, key):
+        return (-self.totals[key], self.first_seen[key])
+
+    def update(self, counts):
+        # counts: {key: delta}
+        grew_only = True
+        for key, delta in counts.items():
+            if key not in self.totals:
+                self.first_seen[key] = len(self.first_seen)
+                self.totals[key] = 0
+            self.totals[key] += delta
+            grew_only = grew_only and delta >= 0
+
+        candidates = set(self.top).union(counts) if grew_only else self.totals
+        self.top = heapq.nsmallest(self.k, candidates, key=self.rank_key)
+        return self
+
+    def items(self):
+        return [(key, self.totals[key]) for key in self.top]
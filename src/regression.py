@@ -0,0 +1,223 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+# PCA and leave-target-out regressions for the correlation analysis. Every numeric column
+# is regressed on all the other numeric columns (with intercept). The Gram matrix of the
+# centered, scaled features is built once, and the targets are solved together as one
+# stacked least-squares problem. Sources run in parallel worker processes, started with
+# 'spawn' so they don't inherit a forked copy of the Tk app or its threads. Inside a worker
+# process (a batch job) the sources run serially instead of starting a nested pool.
+#
+# Sources with OUT_OF_CORE_ROWS rows or more are streamed in batches of BATCH_ROWS. One pass
+# fits the StandardScaler, a second fits IncrementalPCA and accumulates the Gram matrix, and a
+# third writes the projection. Only a batch at a time is held as float64. Each large source is
+# first spilled to a float32 .npy memmap (under MEMMAP_DIR, or the system temp directory), so
+# workers open that file instead of receiving a pickled copy of the frame, and its projection
+# comes back as a read-only memmap rather than an in-memory array.
+
+# below this many rows in total, starting worker processes costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+OUT_OF_CORE_ROWS = 5_000_000
+BATCH_ROWS = 500_000
+MEMMAP_DIR = os.environ.get('PCA_MEMMAP_DIR')
+# join keys added by data_correlation, numeric with the 'hash' key engine but not a feature
+KEY_COLUMNS = ('composite_key',)
+
+R2_COLUMNS = ['source', 'target', 'r_squared', 'n_rows', 'n_features']
+
+
+def r2_from_gram(gram, n_rows):
+    # gram is the centered Gram matrix of the scaled features
+    n_cols = gram.shape[0]
+    if n_cols < 2:
+        return np.full(n_cols, np.nan)
+
+    # stack[j] is the Gram matrix without row/column j, rhs[j] is column j without entry j
+    others = np.array([[i for i in range(n_cols) if i != j] for j in range(n_cols)])
+    targets = np.arange(n_cols)[:, None]
+    stack = gram[others[:, :, None], others[:, None, :]]
+    rhs = gram[targets, others]
+
+    # pinv keeps collinear features solvable, like the lstsq inside LinearRegression
+    coefs = np.einsum('tij,tj->ti', np.linalg.pinv(stack, hermitian=True), rhs)
+    total = np.diag(gram)
+    residual = total - np.einsum('ti,ti->t', rhs, coefs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r_squared = 1.0 - np.maximum(residual, 0.0) / total
+    r_squared[total <= np.finfo(float).eps * n_rows] = np.nan
+    return r_squared
+
+
+def leave_one_out_r2(X_scaled):
+    # R-squared of each column regressed on the remaining columns. Same as fitting
+    # LinearRegression(X without column j, column j) for every j. Constant targets give NaN.
+    centered = X_scaled - X_scaled.mean(axis=0)
+    return r2_from_gram(centered.T @ centered, len(X_scaled))
+
+
+def r2_table(source_name, columns, r_squared, n_rows):
+    return pd.DataFrame({
+        'source': source_name,
+        'target': list(columns),
+        'r_squared': r_squared,
+        'n_rows': n_rows,
+        'n_features': max(len(columns) - 1, 0),
+    }, columns=R2_COLUMNS)
+
+
+def batch_bounds(n_rows, batch_rows, min_rows=2):
+    # IncrementalPCA needs at least n_components rows per batch, a short tail joins the last batch
+    starts = list(range(0, n_rows, batch_rows))
+    if len(starts) > 1 and n_rows - starts[-1] < min_rows:
+        starts.pop()
+    return list(zip(starts, starts[1:] + [n_rows]))
+
+
+def read_batch(data, start, stop):
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[start:stop].to_numpy(dtype=np.float64)
+    return np.asarray(data[start:stop], dtype=np.float64)
+
+
+def numeric_columns(df):
+    # the feature columns, picked by dtype so large frames aren't copied by select_dtypes
+    return [column for column, dtype in df.dtypes.items()
+            if column not in KEY_COLUMNS
+            and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+
+
+def spill_to_memmap(df, columns, path, batch_rows=BATCH_ROWS):
+    # only one batch of the selected columns is materialized at a time
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(len(df), len(columns)))
+    for start, stop in batch_bounds(len(df), batch_rows, min_rows=1):
+        matrix[start:stop] = df.iloc[start:stop][columns].to_numpy(dtype=np.float32)
+    matrix.flush()
+    del matrix
+    return path
+
+
+def analyze_in_core(source_name, numeric_df):
+    if numeric_df.isna().to_numpy().any():
+        raise ValueError(f"{source_name} has missing values in its numeric columns")
+    X_scaled = StandardScaler().fit_transform(numeric_df.to_numpy(dtype=np.float64))
+    X_pca = PCA(n_components=2).fit_transform(X_scaled)
+    return X_pca, r2_table(source_name, numeric_df.columns, leave_one_out_r2(X_scaled), len(numeric_df))
+
+
+def analyze_out_of_core(source_name, data, columns, batch_rows=BATCH_ROWS, projection_path=None):
+    # data is a DataFrame or a (memory-mapped) 2-D array, it is only ever read one batch at a time
+    n_rows, n_cols = data.shape
+    bounds = batch_bounds(n_rows, batch_rows)
+
+    scaler = StandardScaler()
+    for start, stop in bounds:
+        batch = read_batch(data, start, stop)
+        if np.isnan(batch).any():
+            raise ValueError(f"{source_name} has missing values in its numeric columns")
+        scaler.partial_fit(batch)
+
+    ipca = IncrementalPCA(n_components=2)
+    column_sums = np.zeros(n_cols)
+    cross = np.zeros((n_cols, n_cols))
+    for start, stop in bounds:
+        batch = scaler.transform(read_batch(data, start, stop))
+        ipca.partial_fit(batch)
+        column_sums += batch.sum(axis=0)
+        cross += batch.T @ batch
+    gram = cross - np.outer(column_sums, column_sums) / n_rows
+
+    if projection_path:
+        X_pca = np.lib.format.open_memmap(projection_path, mode='w+', dtype=np.float32, shape=(n_rows, 2))
+    else:
+        X_pca = np.empty((n_rows, 2))
+    for start, stop in bounds:
+        X_pca[start:stop] = ipca.transform(scaler.transform(read_batch(data, start, stop)))
+    if projection_path:
+        X_pca.flush()
+        del X_pca
+        X_pca = projection_path
+
+    return X_pca, r2_table(source_name, columns, r2_from_gram(gram, n_rows), n_rows)
+
+
+def analyze_source(source_name, data, columns=None, out_of_core=False, batch_rows=BATCH_ROWS):
+    # runs in a worker process, returns the two PCA components and the R-squared table.
+    # data is the numeric frame, or the path of a spilled .npy whose projection is written next to it
+    if isinstance(data, str):
+        matrix = np.load(data, mmap_mode='r')
+        projection_path = data[:-len('.npy')] + '_pca.npy'
+        return analyze_out_of_core(source_name, matrix, columns, batch_rows, projection_path)
+    if out_of_core:
+        return analyze_out_of_core(source_name, data, data.columns, batch_rows)
+    return analyze_in_core(source_name, data)
+
+
+def load_projection(X_pca):
+    if isinstance(X_pca, str):
+        return np.load(X_pca, mmap_mode='r')
+    return X_pca
+
+
+def analyze_sources(processed_sources, max_workers=None, out_of_core=None, memmap_dir=MEMMAP_DIR):
+    # returns ({source: (X_pca, r2 table) or the exception it raised}, combined R-squared table).
+    # out_of_core=None streams only the sources with OUT_OF_CORE_ROWS rows or more. Streamed
+    # sources are spilled to memmap_dir (the system temp directory when unset) and their
+    # projections are returned as read-only memmaps of the spilled files
+    total_rows = sum(len(df) for df in processed_sources.values())
+
+    jobs = {}
+    spill_dir = None
+    for name, df in processed_sources.items():
+        columns = numeric_columns(df)
+        streamed = len(df) >= OUT_OF_CORE_ROWS if out_of_core is None else out_of_core
+        if streamed and columns:
+            if spill_dir is None:
+                if memmap_dir:
+                    os.makedirs(memmap_dir, exist_ok=True)
+                spill_dir = tempfile.mkdtemp(prefix='pca_', dir=memmap_dir or None)
+            path = os.path.join(spill_dir, re.sub(r'\W+', '_', name) + '.npy')
+            jobs[name] = (name, spill_to_memmap(df, columns, path), columns)
+        else:
+            jobs[name] = (name, df[columns], None, streamed)
+
+    results = {}
+    try:
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        in_worker = multiprocessing.parent_process() is not None
+        if workers > 1 and total_rows >= PARALLEL_MIN_ROWS and not in_worker:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = {name: executor.submit(analyze_source, *job) for name, job in jobs.items()}
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        results[name] = e
+        else:
+            for name, job in jobs.items():
+                try:
+                    results[name] = analyze_source(*job)
+                except Exception as e:
+                    results[name] = e
+
+        # projections spilled to disk are mapped before the spill directory goes away, the open
+        # mapping keeps the unlinked file readable (POSIX) until the caller drops the array
+        for name, result in results.items():
+            if not isinstance(result, Exception) and isinstance(result[0], str):
+                results[name] = (load_projection(result[0]), result[1])
+    finally:
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    tables = [result[1] for result in results.values() if not isinstance(result, Exception)]
+    r2 = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=R2_COLUMNS)
+    return results, r2
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from dtypeprofiles import factorize_sorted
+
+# Single-pass rollups for the SEO and traffic analyses. Date and key are factorized once,
+# the rows are reduced to per-(date, key) cell sums with one bincount per metric, and the
+# month, key and calendar-month totals are all derived from the much smaller cell table.
+# Results match groupby(...).sum(): sorted keys, missing keys dropped, NaN metrics as 0.
+# Grids with at most one cell per row (and DENSE_CELL_LIMIT cells) are bincounted directly,
+# sparser ones only over the cells present, so the cell sums never outgrow the input columns.
+
+DENSE_CELL_LIMIT = 10_000_000
+
+
+class Rollup:
+    def __init__(self, df, key_column, date_column='Mon-Year', sum_columns=()):
+        self.key_column = key_column
+        self.date_column = date_column
+        self.sum_columns = list(sum_columns)
+        self.integer_sums = [pd.api.types.is_integer_dtype(df[col]) for col in self.sum_columns]
+
+        date_codes, self.dates = pd.factorize(df[date_column], sort=True)
+        key_codes, self.keys = factorize_sorted(df[key_column])
+
+        # slot 0 holds rows whose date or key is missing, they only count towards the other rollup
+        n_key_slots = len(self.keys) + 1
+        cells = (date_codes.astype(np.int64) + 1) * n_key_slots + (key_codes + 1)
+        n_cells = (len(self.dates) + 1) * n_key_slots
+        if n_cells <= min(DENSE_CELL_LIMIT, len(df)):
+            cell_codes, cell_ids = cells, np.arange(n_cells)
+        else:
+            cell_codes, cell_ids = pd.factorize(cells)
+        self.cell_dates = cell_ids // n_key_slots
+        self.cell_keys = cell_ids % n_key_slots
+        self.cell_sums = {
+            col: np.bincount(cell_codes, weights=df[col].fillna(0).to_numpy(dtype=np.float64), minlength=len(cell_ids))
+            for col in self.sum_columns
+        }
+        self.cached = {}
+
+    def reduce(self, slots, n_slots):
+        sums = {}
+        for col, is_integer in zip(self.sum_columns, self.integer_sums):
+            values = np.bincount(slots, weights=self.cell_sums[col], minlength=n_slots)[1:]
+            sums[col] = np.rint(values).astype(np.int64) if is_integer else values
+        return sums
+
+    def by_date(self):
+        # groupby(date_column)[sum_columns].sum()
+        if 'date' not in self.cached:
+            sums = self.reduce(self.cell_dates, len(self.dates) + 1)
+            self.cached['date'] = pd.DataFrame(sums, index=pd.Index(self.dates, name=self.date_column))
+        return self.cached['date']
+
+    def by_key(self):
+        # groupby(key_column)[sum_columns].sum()
+        if 'key' not in self.cached:
+            sums = self.reduce(self.cell_keys, len(self.keys) + 1)
+            self.cached['key'] = pd.DataFrame(sums, index=pd.Index(self.keys, name=self.key_column))
+        return self.cached['key']
+
+    def by_calendar_month(self):
+        # groupby(date_column.dt.month)[sum_columns].sum(), from the per-date totals
+        if 'calendar_month' not in self.cached:
+            monthly = self.by_date()
+            self.cached['calendar_month'] = monthly.groupby(pd.DatetimeIndex(monthly.index).month).sum()
+        return self.cached['calendar_month']
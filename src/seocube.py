@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from dtypeprofiles import factorize_sorted
+
+# Pre-aggregated (Mon-Year, key) cube for the SEO dashboard. Rows are reduced once to
+# per-date, per-key sums and non-null counts, stored as prefix sums over the sorted dates.
+# A date range is then two binary searches and one subtraction of prefix sum rows.
+
+# dense prefix sums keep every (date, key) cell for every metric, so they are only used while
+# the grid stays within DENSE_CELLS_PER_ROW cells per input row and DENSE_CELL_LIMIT cells in
+# total. Sparser or larger cubes keep only the cells present and slice them by date
+DENSE_CELLS_PER_ROW = 2
+DENSE_CELL_LIMIT = 5_000_000
+
+
+def use_dense(n_cells, n_rows):
+    return n_cells <= min(DENSE_CELL_LIMIT, DENSE_CELLS_PER_ROW * n_rows)
+
+
+class MonthlyCube:
+    def __init__(self, df, key_column, date_column='Mon-Year',
+                 sum_columns=('Clicks', 'Impressions'), mean_columns=('CTR', 'Position')):
+        self.key_column = key_column
+        self.sum_columns = list(sum_columns)
+        self.mean_columns = list(mean_columns)
+
+        date_values = df[date_column].to_numpy(dtype='datetime64[ns]')
+        self.dates, date_codes = np.unique(date_values, return_inverse=True)
+        key_codes, self.keys = factorize_sorted(df[key_column])
+        self.integer_sums = [pd.api.types.is_integer_dtype(df[col]) for col in self.sum_columns]
+
+        # per metric weights: sums for sum columns, sums and non-null counts for mean columns
+        weights = {}
+        for col in self.sum_columns:
+            weights[col] = df[col].fillna(0).to_numpy(dtype=np.float64)
+        for col in self.mean_columns:
+            values = df[col].to_numpy(dtype=np.float64)
+            weights[col] = np.nan_to_num(values)
+            weights[f"{col}__count"] = (~np.isnan(values)).astype(np.float64)
+        weights['__rows'] = np.ones(len(df))
+        self.metrics = list(weights)
+
+        n_dates, n_keys = len(self.dates), len(self.keys)
+        self.date_totals = {
+            name: np.concatenate(([0.0], np.cumsum(np.bincount(date_codes, weights=w, minlength=n_dates))))
+            for name, w in weights.items()
+        }
+
+        valid = key_codes >= 0
+        cell_codes = date_codes[valid].astype(np.int64) * n_keys + key_codes[valid]
+        self.dense = use_dense(n_dates * n_keys, len(df))
+        if self.dense:
+            self.prefix = {}
+            for name, w in weights.items():
+                cells = np.bincount(cell_codes, weights=w[valid], minlength=n_dates * n_keys)
+                prefix = np.zeros((n_dates + 1, n_keys))
+                np.cumsum(cells.reshape(n_dates, n_keys), axis=0, out=prefix[1:])
+                self.prefix[name] = prefix
+        else:
+            unique_cells, cell_inverse = np.unique(cell_codes, return_inverse=True)
+            self.cell_dates = unique_cells // n_keys
+            self.cell_keys = unique_cells % n_keys
+            self.cell_values = {
+                name: np.bincount(cell_inverse, weights=w[valid], minlength=len(unique_cells))
+                for name, w in weights.items()
+            }
+
+    def date_range(self, start, end):
+        # rows with start <= Mon-Year <= end, same bounds as the boolean masks it replaces
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), side='right')
+        return lo, max(lo, hi)
+
+    def key_sums(self, lo, hi):
+        if self.dense:
+            return {name: self.prefix[name][hi] - self.prefix[name][lo] for name in self.metrics}
+        cell_lo, cell_hi = np.searchsorted(self.cell_dates, [lo, hi], side='left')
+        keys = self.cell_keys[cell_lo:cell_hi]
+        return {
+            name: np.bincount(keys, weights=self.cell_values[name][cell_lo:cell_hi], minlength=len(self.keys))
+            for name in self.metrics
+        }
+
+    def finish(self, sums):
+        result = {}
+        for col, is_integer in zip(self.sum_columns, self.integer_sums):
+            result[col] = np.rint(sums[col]).astype(np.int64) if is_integer else sums[col]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for col in self.mean_columns:
+                result[col] = sums[col] / sums[f"{col}__count"]
+        return result
+
+    def aggregate(self, start, end):
+        # equivalent of groupby(key).agg(sum/mean) over the rows in the date range, sorted by key
+        lo, hi = self.date_range(start, end)
+        sums = self.key_sums(lo, hi)
+        present = sums['__rows'] > 0
+        result = self.finish({name: values[present] for name, values in sums.items()})
+        return pd.DataFrame(result, index=pd.Index(self.keys[present], name=self.key_column))
+
+    def totals(self, start, end):
+        # whole-range totals, including rows without a key
+        lo, hi = self.date_range(start, end)
+        sums = {name: np.array([prefix[hi] - prefix[lo]]) for name, prefix in self.date_totals.items()}
+        result = {col: values[0] for col, values in self.finish(sums).items()}
+        result['rows'] = int(sums['__rows'][0])
+        return result
@@ -1,7 +1,31 @@
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
+from datacache import read_excel_cached
+from dtypeprofiles import apply_profile
+from analyticsstore import save_to_store
+from seocube import MonthlyCube
+from joinengine import KeyIndex
+from taskrunner import run_task
+from instrumentation import traced
+from virtualtable import TableModel, VirtualTable
+
+# page cubes of the most recently selected product groups kept in memory
+GROUP_CUBE_CACHE_SIZE = 16
+
+METRIC_COLUMNS = ["Clicks", "Impressions", "CTR", "Position"]
+TABLE_COLUMNS = {
+    'First Level': ["First Level"] + METRIC_COLUMNS,
+    'Top Queries': ["Top Queries"] + METRIC_COLUMNS,
+}
+TABLE_HEADINGS = {"CTR": "CTR (%)"}
+TABLE_FORMATTERS = {
+    "CTR": lambda value: f"{value*100:.2f}%",
+    "Position": lambda value: f"{value:.2f}",
+}
 
 class SEOAnalysisDashboard:
     def __init__(self, root):
@@ -9,22 +33,83 @@ class SEOAnalysisDashboard:
         self.root.title("SEO Analysis Dashboard")
         self.root.geometry("1400x800")
 
-        self.initialize_data()
-        self.create_layout()
-
-    def initialize_data(self):
-        try:
-            self.items_catalog = pd.read_excel('items_catalog.xlsx', sheet_name='Items Catalog')
-            self.seo_queries = pd.read_excel('seo_queries.xlsx', sheet_name='SEO Queries')
-            self.seo_pages = pd.read_excel('seo_pages.xlsx', sheet_name='SEO Pages')
-
-            self.seo_queries['Mon-Year'] = pd.to_datetime(self.seo_queries['Mon-Year'], format='%Y-%m-%d')
-            self.seo_pages['Mon-Year'] = pd.to_datetime(self.seo_pages['Mon-Year'], format='%Y-%m-%d')
+        # the workbooks are loaded on a worker thread, the layout is built once they are ready
+        run_task(
+            self.root, self.initialize_data,
+            on_done=lambda _: self.create_layout(),
+            on_error=self.on_load_error,
+            title="Loading SEO data..."
+        )
 
-            self.item_product_group_mapping = self.items_catalog.groupby('item_product_group')['item_number'].apply(list).reset_index()
-        except Exception as e:
-            messagebox.showerror("Data Loading Error", f"Could not load data: {e}")
-            raise
+    def on_load_error(self, e):
+        messagebox.showerror("Data Loading Error", f"Could not load data: {e}")
+        self.root.destroy()
+
+    @traced
+    def initialize_data(self, progress=None):
+        if progress:
+            progress("Loading SEO workbooks...")
+        self.items_catalog = read_excel_cached('items_catalog.xlsx', sheet_name='Items Catalog')
+        self.seo_queries = read_excel_cached('seo_queries.xlsx', sheet_name='SEO Queries')
+        self.seo_pages = read_excel_cached('seo_pages.xlsx', sheet_name='SEO Pages')
+
+        self.seo_queries['Mon-Year'] = pd.to_datetime(self.seo_queries['Mon-Year'], format='%Y-%m-%d')
+        self.seo_pages['Mon-Year'] = pd.to_datetime(self.seo_pages['Mon-Year'], format='%Y-%m-%d')
+        apply_profile(self.items_catalog, 'items_catalog')
+        apply_profile(self.seo_queries, 'seo_queries')
+        apply_profile(self.seo_pages, 'seo_pages')
+
+        save_to_store('items_catalog', self.items_catalog, source_path='items_catalog.xlsx')
+        save_to_store('seo_queries', self.seo_queries, source_path='seo_queries.xlsx')
+        save_to_store('seo_pages', self.seo_pages, source_path='seo_pages.xlsx')
+        self.prepare_data(progress)
+
+    @traced
+    def prepare_data(self, progress=None):
+        # everything derived from the three loaded frames, no widgets involved
+        self.item_product_group_mapping = self.items_catalog.groupby('item_product_group', observed=True)['item_number'].apply(list).reset_index()
+
+        # page levels are parsed once here instead of on every dashboard update
+        self.seo_pages['First Level'] = self.seo_pages['Page'].str.split('/').str[1]
+        self.seo_pages['Item Number'] = self.seo_pages['Page'].str.extract(r'([^/]+)$')[0]
+        self.seo_pages = self.seo_pages[self.seo_pages['First Level'] != " "]
+
+        if progress:
+            progress("Building dashboard cubes...")
+        self.page_cube = MonthlyCube(self.seo_pages, 'First Level')
+        self.query_cube = MonthlyCube(self.seo_queries, 'Top queries')
+        self.build_group_index()
+
+    @traced
+    def build_group_index(self):
+        # item number -> page rows inverted index, and product group -> item number set
+        page_items = self.seo_pages['Item Number'].astype(str).str.strip().str.lower()
+        item_codes, self.page_item_numbers = pd.factorize(page_items)
+        self.page_item_index = KeyIndex(item_codes, len(self.page_item_numbers))
+
+        self.group_items = {
+            group: set(pd.Series(items, dtype=object).astype(str).str.strip().str.lower())
+            for group, items in zip(self.item_product_group_mapping['item_product_group'],
+                                    self.item_product_group_mapping['item_number'])
+        }
+        self.group_page_cubes = OrderedDict()
+
+    @traced
+    def page_cube_for_group(self, group):
+        # pages of the group's items, gathered through the index and cubed once per group.
+        # only the GROUP_CUBE_CACHE_SIZE most recently used groups are kept
+        if group not in self.group_items:
+            return self.page_cube
+        if group in self.group_page_cubes:
+            self.group_page_cubes.move_to_end(group)
+            return self.group_page_cubes[group]
+        codes = self.page_item_numbers.get_indexer(list(self.group_items[group]))
+        codes = codes[codes >= 0]
+        rows = np.sort(np.concatenate([self.page_item_index.rows_for(code) for code in codes])) if len(codes) else []
+        self.group_page_cubes[group] = MonthlyCube(self.seo_pages.iloc[rows], 'First Level')
+        if len(self.group_page_cubes) > GROUP_CUBE_CACHE_SIZE:
+            self.group_page_cubes.popitem(last=False)
+        return self.group_page_cubes[group]
 
     def create_layout(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -74,123 +159,63 @@ class SEOAnalysisDashboard:
         self.ctr_label = ttk.Label(self.metrics_frame, text="Avg CTR: -", font=("Arial", 12))
         self.ctr_label.pack(side=tk.LEFT, padx=10)
 
-        self.page_performance_frame = ttk.Frame(dashboard_frame)
-        self.page_performance_frame.pack(fill=tk.X, pady=10)
-
-        self.page_performance_tree = ttk.Treeview(
-            self.page_performance_frame,
-            columns=("First Level", "Clicks", "Impressions", "CTR", "Position"),
-            show="headings"
-        )
-        self.page_performance_tree.heading("First Level", text="First Level")
-        self.page_performance_tree.heading("Clicks", text="Clicks")
-        self.page_performance_tree.heading("Impressions", text="Impressions")
-        self.page_performance_tree.heading("CTR", text="CTR (%)")
-        self.page_performance_tree.heading("Position", text="Position")
-
-        page_scrollbar = ttk.Scrollbar(self.page_performance_frame, orient=tk.VERTICAL, command=self.page_performance_tree.yview)
-        self.page_performance_tree.configure(yscroll=page_scrollbar.set)
-
-        self.page_performance_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        page_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.top_queries_frame = ttk.Frame(dashboard_frame)
-        self.top_queries_frame.pack(fill=tk.X, pady=10)
-
-        self.top_queries_tree = ttk.Treeview(
-            self.top_queries_frame,
-            columns=("Top Queries", "Clicks", "Impressions", "CTR", "Position"),
-            show="headings"
+        # full ranked tables, only the visible rows are rendered (header click sorts by that column)
+        self.page_performance_table = VirtualTable(
+            dashboard_frame, TABLE_COLUMNS['First Level'], headings=TABLE_HEADINGS, height=8,
+            sort_column="Clicks", descending=True
         )
-        self.top_queries_tree.heading("Top Queries", text="Top Queries")
-        self.top_queries_tree.heading("Clicks", text="Clicks")
-        self.top_queries_tree.heading("Impressions", text="Impressions")
-        self.top_queries_tree.heading("CTR", text="CTR (%)")
-        self.top_queries_tree.heading("Position", text="Position")
+        self.page_performance_table.pack(fill=tk.X, pady=10)
 
-        top_queries_scrollbar = ttk.Scrollbar(self.top_queries_frame, orient=tk.VERTICAL, command=self.top_queries_tree.yview)
-        self.top_queries_tree.configure(yscroll=top_queries_scrollbar.set)
-
-        self.top_queries_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        top_queries_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.top_queries_table = VirtualTable(
+            dashboard_frame, TABLE_COLUMNS['Top Queries'], headings=TABLE_HEADINGS, height=15,
+            sort_column="Clicks", descending=True
+        )
+        self.top_queries_table.pack(fill=tk.BOTH, expand=True, pady=10)
 
+    @traced
     def update_dashboard(self, event=None):
         try:
             selected_group = self.product_group_var.get()
-            start_date = self.start_date_entry.get_date()
-            end_date = self.end_date_entry.get_date()
+            start_date = pd.to_datetime(self.start_date_entry.get_date())
+            end_date = pd.to_datetime(self.end_date_entry.get_date())
 
-            # Filter pages based on product group and date range
-            item_numbers = self.items_catalog[self.items_catalog['item_product_group'] == selected_group]['item_number'].tolist()
-            filtered_pages = self.seo_pages[
-                (self.seo_pages['Mon-Year'] >= pd.to_datetime(start_date)) &
-                (self.seo_pages['Mon-Year'] <= pd.to_datetime(end_date))
-            ]
-
-
-            #a
-            if item_numbers:
-                filtered_pages.loc[:, 'First Level'] = filtered_pages['Page'].str.split('/').str[1]
-                filtered_pages.loc[:,'Item Number']= filtered_pages['Page'].str.extract(r'([^/]+)$')[0]
-                filtered_pages = filtered_pages[filtered_pages['First Level'] != " "]
-
-            self.update_metrics(filtered_pages)
-            self.populate_page_performance_tree(filtered_pages)
-
-
-            #(r'([^/]+)$')[0]
-            # Filter queries based on product group and date range
-
-            filtered_queries = self.seo_queries[
-                (self.seo_queries['Mon-Year'] >= pd.to_datetime(start_date)) &
-                (self.seo_queries['Mon-Year'] <= pd.to_datetime(end_date))
-            ]
-            self.populate_top_queries_tree(filtered_queries)
+            page_totals, page_performance, top_queries = self.dashboard_tables(selected_group, start_date, end_date)
+            self.update_metrics(page_totals)
+            self.populate_page_performance_tree(page_performance)
+            self.populate_top_queries_tree(top_queries)
 
         except Exception as e:
             messagebox.showerror("Update Error", f"An error occurred: {e}")
 
-    def update_metrics(self, filtered_pages):
-        total_clicks = filtered_pages['Clicks'].sum()
-        total_impressions = filtered_pages['Impressions'].sum()
-        avg_ctr = filtered_pages['CTR'].mean() * 100 if not filtered_pages.empty else 0
+    @traced
+    def dashboard_tables(self, selected_group, start_date, end_date):
+        # Page metrics are limited to the selected group's item pages, queries cover all pages
+        page_cube = self.page_cube_for_group(selected_group)
+        return (
+            page_cube.totals(start_date, end_date),
+            page_cube.aggregate(start_date, end_date),
+            self.query_cube.aggregate(start_date, end_date),
+        )
+
+    @traced
+    def update_metrics(self, page_totals):
+        total_clicks = page_totals['Clicks']
+        total_impressions = page_totals['Impressions']
+        avg_ctr = page_totals['CTR'] * 100 if page_totals['rows'] else 0
 
         self.clicks_label.config(text=f"Total Clicks: {total_clicks}")
         self.impressions_label.config(text=f"Total Impressions: {total_impressions}")
         self.ctr_label.config(text=f"Avg CTR: {avg_ctr:.2f}%")
 
-    def populate_page_performance_tree(self, filtered_pages):
-        for i in self.page_performance_tree.get_children():
-            self.page_performance_tree.delete(i)
-
-        page_performance = filtered_pages.groupby('First Level').agg({
-            'Clicks': 'sum',
-            'Impressions': 'sum',
-            'CTR': 'mean',
-            'Position': 'mean'
-        }).sort_values('Clicks', ascending=False)
-        page_performance = page_performance.head(7)
-
-        for first_level, row in page_performance.iterrows():
-            self.page_performance_tree.insert("", tk.END, values=(
-                first_level, row['Clicks'], row['Impressions'], f"{row['CTR']*100:.2f}%", f"{row['Position']:.2f}"
-            ))
-
-    def populate_top_queries_tree(self, filtered_queries):
-        for i in self.top_queries_tree.get_children():
-            self.top_queries_tree.delete(i)
-
-        top_queries = filtered_queries.groupby('Top queries').agg({
-            'Clicks': 'sum',
-            'Impressions': 'sum',
-            'CTR': 'mean',
-            'Position': 'mean'
-        }).sort_values('Clicks', ascending=False)
-        top_queries = top_queries.head(7)
-
-        for query, row in top_queries.iterrows():
-            self.top_queries_tree.insert("", tk.END, values=(
-                query, row['Clicks'], row['Impressions'], f"{row['CTR']*100:.2f}%", f"{row['Position']:.2f}"
-            ))
+    @traced
+    def populate_page_performance_tree(self, page_performance):
+        model = TableModel.from_frame(page_performance[METRIC_COLUMNS], 'First Level', formatters=TABLE_FORMATTERS)
+        self.page_performance_table.set_model(model)
+
+    @traced
+    def populate_top_queries_tree(self, top_queries):
+        model = TableModel.from_frame(top_queries[METRIC_COLUMNS], 'Top Queries', formatters=TABLE_FORMATTERS)
+        self.top_queries_table.set_model(model)
 
 def start_app():
     root = tk.Tk()
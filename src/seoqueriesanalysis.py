@@ -1,37 +1,102 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from datacache import read_excel_cached
+from analyticsstore import save_to_store
+from taskrunner import run_task
+from plotting import density_plot, save_or_show, use_density
+from monthlyingest import default_source, ingest_monthly, monthly_aggregates
+from rollup import Rollup
+from dtypeprofiles import apply_profile
+from instrumentation import span, traced
+from ranking import top_rows
 
-def upload_file():
+@traced
+def load_queries(file_path):
+    data = read_excel_cached(file_path)
+    data.columns = ['Top queries', 'Clicks', 'Impressions', 'CTR', 'Position', 'Mon-Year']
+    data['Mon-Year'] = pd.to_datetime(data['Mon-Year'], format='%b-%Y')
+    apply_profile(data, 'seo_queries')
+    save_to_store('seo_queries', data, source_path=file_path)
+    return data
+
+def show_queries(data, root=None):
+    from tkinter import messagebox
+    messagebox.showinfo("File Upload", "File uploaded successfully!")
+    #the rollup runs on a worker thread, only the figure is drawn on the UI thread
+    run_task(
+        root, compute_all_analyses, data,
+        on_done=lambda totals: run_all_analyses(data, totals=totals),
+        on_error=lambda e: messagebox.showerror("Analysis Error", f"Failed to analyze queries: {e}"),
+        title="Analyzing SEO queries..."
+    )
+
+def upload_file(root=None):
+    #tkinter is only imported by the dialogs so batch runs can load this module headless
+    from tkinter import filedialog, messagebox
     file_path = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx;*.xls")])
     if not file_path:
         return None
 
-    try:
-        data = pd.read_excel(file_path)
-        data.columns = ['Top queries', 'Clicks', 'Impressions', 'CTR', 'Position', 'Mon-Year']
-        data['Mon-Year'] = pd.to_datetime(data['Mon-Year'], format='%b-%Y')
-        messagebox.showinfo("File Upload", "File uploaded successfully!")
-        run_all_analyses(data)
-        return data
-    except Exception as e:
-        messagebox.showerror("File Error", f"Failed to load file: {e}")
-        return None
+    #with a Tk root the file is parsed on a worker thread and None is returned right away
+    loaded = []
+    def on_done(data):
+        loaded.append(data)
+        show_queries(data, root)
+
+    run_task(
+        root, load_queries, file_path,
+        on_done=on_done,
+        on_error=lambda e: messagebox.showerror("File Error", f"Failed to load file: {e}"),
+        title="Loading SEO queries..."
+    )
+    return loaded[0] if loaded else None
+
+@traced
+def show_monthly_trends(file_path, output=None, source=None):
+    #append-only mode: only Mon-Year partitions not yet stored are read from the export
+    #the plot covers the export's source (its directory by default), not every stored source
+    source = source or default_source(file_path)
+    new_months = ingest_monthly('seo_queries', file_path, source=source)
+    print(f"Ingested {len(new_months)} new SEO query month(s) for {source}")
+    monthly = monthly_aggregates('seo_queries', source=source)
 
-def run_all_analyses(data):
+    fig, axs = plt.subplots(1, 2, figsize=(16, 6))
+    fig.suptitle("SEO Monthly Trends", fontsize=16, fontweight='bold')
+    trend_analysis(None, axs[0], monthly=monthly)
+    seasonal_trends(None, axs[1], monthly=monthly)
+    plt.tight_layout(rect=[0, 0, 1, 0.95])
+    save_or_show(fig, output)
+
+@traced
+def compute_all_analyses(data):
+    #month and query totals for all panels in one pass over the rows, no Tk or pyplot calls
+    rollup = Rollup(data, 'Top queries', sum_columns=['Clicks', 'Impressions'])
+    return {'monthly': rollup.by_date(), 'query_totals': rollup.by_key()}
+
+@traced
+def run_all_analyses(data, output=None, totals=None):
+    #totals: compute_all_analyses's result, when it was already computed off the UI thread
+    if totals is None:
+        totals = compute_all_analyses(data)
     fig, axs = plt.subplots(2, 2, figsize=(16, 12))
     fig.suptitle("SEO Analysis Dashboard", fontsize=16, fontweight='bold')
-    trend_analysis(data, axs[0, 0])
-    top_performing_queries(data, axs[0, 1])
+    monthly = totals['monthly']
+    trend_analysis(data, axs[0, 0], monthly=monthly)
+    top_performing_queries(data, axs[0, 1], query_totals=totals['query_totals'])
     ctr_vs_position(data, axs[1, 0])
-    seasonal_trends(data, axs[1, 1])
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.show()
+    seasonal_trends(data, axs[1, 1], monthly=monthly)
+    with span('matplotlib.tight_layout'):
+        plt.tight_layout(rect=[0, 0, 1, 0.95])
+    save_or_show(fig, output)
 
-def trend_analysis(data, ax):
-    monthly_data = data.groupby('Mon-Year')[['Clicks', 'Impressions']].sum().reset_index()
+@traced
+def trend_analysis(data, ax, monthly=None):
+    #monthly: per-month totals (Rollup.by_date or monthlyingest.monthly_aggregates), used instead of the rows
+    if monthly is not None:
+        monthly_data = monthly[['Clicks', 'Impressions']].reset_index()
+    else:
+        monthly_data = data.groupby('Mon-Year')[['Clicks', 'Impressions']].sum().reset_index()
     ax.plot(monthly_data['Mon-Year'], monthly_data['Clicks'], label='Clicks', marker='o')
     ax.plot(monthly_data['Mon-Year'], monthly_data['Impressions'], label='Impressions', marker='s')
     ax.set_title("Monthly Trends for Clicks and Impressions")
@@ -40,24 +105,36 @@ def trend_analysis(data, ax):
     ax.legend()
     ax.grid()
 
-def top_performing_queries(data, ax):
-    top_queries = data.groupby('Top queries')[['Clicks', 'Impressions']].sum().reset_index()
-    top_queries = top_queries.sort_values(by='Clicks', ascending=False).head(10)
+@traced
+def top_performing_queries(data, ax, query_totals=None):
+    #query_totals: per-query sums indexed by 'Top queries' (Rollup.by_key), used instead of the rows
+    if query_totals is None:
+        query_totals = data.groupby('Top queries', observed=True)[['Clicks', 'Impressions']].sum()
+    top_queries = query_totals[['Clicks', 'Impressions']].reset_index()
+    top_queries = top_rows(top_queries, 'Clicks', 10)
     sns.barplot(x='Clicks', y='Top queries', data=top_queries, palette='viridis', ax=ax)
     ax.set_title("Top 10 Performing Queries by Clicks")
     ax.set_xlabel("Clicks")
     ax.set_ylabel("Top Queries")
     ax.grid()
 
+@traced
 def ctr_vs_position(data, ax):
-    sns.scatterplot(x='Position', y='CTR', data=data, alpha=0.6, ax=ax)
+    if use_density(len(data)):
+        density_plot(ax, data['Position'], data['CTR'])
+    else:
+        sns.scatterplot(x='Position', y='CTR', data=data, alpha=0.6, ax=ax)
     ax.set_title("CTR vs Average Position")
     ax.set_xlabel("Position")
     ax.set_ylabel("CTR (%)")
     ax.grid()
 
-def seasonal_trends(data, ax):
-    monthly_clicks = data.groupby(data['Mon-Year'].dt.month)['Clicks'].sum()
+@traced
+def seasonal_trends(data, ax, monthly=None):
+    if monthly is not None:
+        monthly_clicks = monthly.groupby(monthly.index.month)['Clicks'].sum()
+    else:
+        monthly_clicks = data.groupby(data['Mon-Year'].dt.month)['Clicks'].sum()
     ax.bar(monthly_clicks.index, monthly_clicks.values, color='teal', edgecolor='black')
     ax.set_title("Seasonal Trends in Clicks")
     ax.set_xlabel("Month")
@@ -0,0 +1,118 @@
+import inspect
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Runs loads and analyses on a worker thread and hands the results back to the Tk thread
+# through root.after polling, so the windows keep redrawing while files are parsed.
+POLL_INTERVAL_MS = 100
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class BackgroundTask:
+    def __init__(self, runner, func, args, kwargs, on_done, on_error, title):
+        self.runner = runner
+        self.root = runner.root
+        self.on_done = on_done
+        self.on_error = on_error
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+        # functions with a progress parameter get a callback, it raises TaskCancelled after cancel
+        if 'progress' in inspect.signature(func).parameters:
+            kwargs = dict(kwargs, progress=self.report)
+
+        self.create_window(title)
+        self.future = runner.executor.submit(func, *args, **kwargs)
+        self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def create_window(self, title):
+        #tkinter is only needed once a window is shown, inline runs (root=None) stay headless
+        import tkinter as tk
+        from tkinter import ttk
+        self.window = tk.Toplevel(self.root)
+        self.window.title(title)
+        self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.message_label = ttk.Label(self.window, text=title, width=50)
+        self.message_label.pack(padx=20, pady=(15, 5))
+        self.progress_bar = ttk.Progressbar(self.window, mode='indeterminate', length=300)
+        self.progress_bar.pack(padx=20, pady=5)
+        self.progress_bar.start(15)
+        ttk.Button(self.window, text="Cancel", command=self.cancel).pack(pady=(5, 15))
+
+    def report(self, message=None, fraction=None):
+        # called from the worker thread
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+        self.messages.put((message, fraction))
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.future.cancel()
+        self.message_label.config(text="Cancelling...")
+
+    def poll(self):
+        while not self.messages.empty():
+            message, fraction = self.messages.get_nowait()
+            if message:
+                self.message_label.config(text=message)
+            if fraction is not None:
+                self.progress_bar.stop()
+                self.progress_bar.config(mode='determinate', value=fraction * 100)
+
+        if not self.future.done():
+            self.root.after(POLL_INTERVAL_MS, self.poll)
+            return
+
+        self.window.destroy()
+        if self.cancel_event.is_set() or self.future.cancelled():
+            return
+        error = self.future.exception()
+        if isinstance(error, TaskCancelled):
+            return
+        if error is not None:
+            self.on_error(error)
+        elif self.on_done is not None:
+            self.on_done(self.future.result())
+
+
+class TaskRunner:
+    runners = {}
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+
+    @classmethod
+    def for_root(cls, root):
+        # one shared executor per Tk application
+        top = root.nametowidget('.')
+        if top not in cls.runners:
+            cls.runners[top] = cls(top)
+        return cls.runners[top]
+
+    def submit(self, func, *args, on_done=None, on_error=None, title="Working...", **kwargs):
+        from tkinter import messagebox
+        on_error = on_error or (lambda e: messagebox.showerror("Error", f"An error occurred: {e}"))
+        return BackgroundTask(self, func, args, kwargs, on_done, on_error, title)
+
+
+def run_task(root, func, *args, on_done=None, on_error=None, title="Working...", **kwargs):
+    # without a Tk root (scripts, batch runs) the task simply runs inline
+    if root is None:
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(e)
+            return None
+        if on_done is not None:
+            on_done(result)
+        return None
+    return TaskRunner.for_root(root).submit(func, *args, on_done=on_done, on_error=on_error, title=title, **kwargs)
@@ -1,40 +1,84 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-import numpy as np
+from datacache import read_excel_cached
+from analyticsstore import save_to_store
+from plotting import save_or_show
+from monthlyingest import default_source, ingest_monthly, monthly_aggregates
+from rollup import Rollup
+from forecasting import RevenueForecaster, backtest
+from dtypeprofiles import apply_profile
+from instrumentation import span, traced
+from ranking import top_rows
 
+@traced
 def load_data(file_path):
     try:
-        data = pd.read_excel(file_path)
+        data = read_excel_cached(file_path)
         data['Mon-Year'] = pd.to_datetime(data['Mon-Year'], format='%b-%Y')
+        apply_profile(data, 'traffic')
+        save_to_store('traffic', data, source_path=file_path)
         return data
     except Exception as e:
         print(f"Error loading data: {e}")
         return None
     
 
-def perform_analysis(data):
+@traced
+def compute_analysis(data, horizon=2):
+    #no Tk or pyplot calls here, the main window runs it on a worker thread
+    #item and month totals for the panels in one pass over the rows, plus the revenue forecast fits
+    rollup = Rollup(data, 'Item name', sum_columns=['Items added to cart', 'Items purchased'])
+    return {
+        'descriptive_stats': data[['Items viewed', 'Items added to cart', 'Items purchased']].describe(),
+        'product_totals': rollup.by_key(),
+        'monthly': rollup.by_date(),
+        'prediction': forecast_revenue(data, horizon),
+    }
+
+@traced
+def perform_analysis(data, output=None, analysis=None):
+    #analysis: compute_analysis's result, when it was already computed off the UI thread
     if data is None:
         print("No data, please upload data")
         return
+    if analysis is None:
+        analysis = compute_analysis(data)
 
     fig, axs = plt.subplots(2, 2, figsize=(16, 12))
     fig.suptitle("Traffic Analysis Overview", fontsize=16, fontweight='bold')
-    descriptive_stats = data[['Items viewed', 'Items added to cart', 'Items purchased']].describe()
+    descriptive_stats = analysis['descriptive_stats']
     axs[0, 0].axis('off')
     axs[0, 0].table(cellText=descriptive_stats.values, colLabels=descriptive_stats.columns, loc='center', cellLoc='center', colColours=["#D3D3D3"]*descriptive_stats.shape[1])
     axs[0, 0].set_title('Descriptive Statistics', fontsize=18, fontweight='bold')
 
-    product_performance_plot(data, axs[0, 1])
-    trend_analysis(data, axs[1, 0])
-    revenue_prediction(data, axs[1, 1])
+    product_performance_plot(data, axs[0, 1], product_totals=analysis['product_totals'])
+    trend_analysis(data, axs[1, 0], monthly=analysis['monthly'])
+    revenue_prediction(data, axs[1, 1], prediction=analysis['prediction'])
     
-    plt.tight_layout(rect=[0, 0, 1, 0.96])
-    plt.show()
+    with span('matplotlib.tight_layout'):
+        plt.tight_layout(rect=[0, 0, 1, 0.96])
+    save_or_show(fig, output)
+
+@traced
+def show_monthly_trends(file_path, output=None, source=None):
+    #append-only mode: only Mon-Year partitions not yet stored are read from the export
+    #the plot covers the export's source (its directory by default), not every stored source
+    source = source or default_source(file_path)
+    new_months = ingest_monthly('traffic', file_path, source=source)
+    print(f"Ingested {len(new_months)} new traffic month(s) for {source}")
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    trend_analysis(None, ax, monthly=monthly_aggregates('traffic', source=source))
+    plt.tight_layout()
+    save_or_show(fig, output)
 
-def product_performance_plot(data, ax):
-    product_data = data.groupby('Item name')[['Items added to cart', 'Items purchased']].sum()
-    top_products = product_data.sort_values(by='Items purchased', ascending=False).head(10)
+@traced
+def product_performance_plot(data, ax, product_totals=None):
+    #product_totals: per-item sums indexed by 'Item name' (Rollup.by_key), used instead of the rows
+    if product_totals is None:
+        product_totals = data.groupby('Item name', observed=True)[['Items added to cart', 'Items purchased']].sum()
+    product_data = product_totals[['Items added to cart', 'Items purchased']]
+    top_products = top_rows(product_data, 'Items purchased', 10)
 
     # top 10
     top_products[['Items added to cart', 'Items purchased']].plot(kind='bar', ax=ax, stacked=False)
@@ -45,38 +89,43 @@ def product_performance_plot(data, ax):
     ax.set_xticklabels(top_products.index, rotation=45, ha="right") 
     ax.legend(["Items Added to Cart", "Items Purchased"])
 
-def trend_analysis(data, ax):
-    monthly_data = data.groupby(data['Mon-Year'].dt.to_period('M'))[['Items added to cart', 'Items purchased']].sum()
+@traced
+def trend_analysis(data, ax, monthly=None):
+    #monthly: per-month totals (Rollup.by_date or monthlyingest.monthly_aggregates), used instead of the rows
+    if monthly is not None:
+        monthly_data = monthly[['Items added to cart', 'Items purchased']]
+        monthly_data.index = monthly_data.index.to_period('M')
+    else:
+        monthly_data = data.groupby(data['Mon-Year'].dt.to_period('M'))[['Items added to cart', 'Items purchased']].sum()
     monthly_data.plot(ax=ax)
     ax.set_title('Monthly Trends in Adds to Cart and Purchases')
     ax.set_ylabel('Count')
 
-def revenue_prediction(data, ax):
-    features = ['Items viewed', 'Items added to cart', 'Items purchased']
-    target = 'Item revenue'
-    data['Month'] = data['Mon-Year'].dt.month  
-    data = data.sort_values('Month') 
-    #use the previous 10 month to predict the last two month
-    #no 11 & 12 input so unable to predict these two months
-    data_10_months = data[data['Month'] <= 10] 
+@traced
+def forecast_revenue(data, horizon=2):
+    #one model per item (revenue ~ trend + views/adds/purchases), fitted together in forecasting.py
+    #returns total actual revenue, the summed item forecasts for the next `horizon` months and the plot title
+    forecaster = RevenueForecaster().fit(data)
+    panel = forecaster.panel
+    forecast = forecaster.forecast(horizon).groupby('Mon-Year')['Predicted revenue'].sum()
+    actual_revenue = pd.Series(panel.totals['Item revenue'].sum(axis=0), index=panel.months)
 
+    title = f'Revenue Forecast for the Next {horizon} Months'
+    if panel.n_months > horizon:
+        _, metrics = backtest(panel=panel, holdout=horizon)
+        print(f"Revenue backtest over the last {horizon} months: MAE {metrics['mae']:.2f}, MAPE {metrics['mape']:.1%}")
+        title += f"\n(backtest MAPE {metrics['mape']:.1%})"
+    return actual_revenue, forecast, title
 
-    #code using sckit learn linearmodel
-    #currently not working
-    #====================================
-    X = data_10_months[['Month'] + features]
-    y = data_10_months[target]
-    model = LinearRegression()
-    model.fit(X, y)
-    future_months = np.array([[11], [12]])
-    future_features = np.tile(data_10_months[features].mean().values, (2, 1))
-    X_future = np.hstack((future_months, future_features))
-    predicted_revenue = model.predict(X_future)
-    monthly_revenue_10_months = data_10_months.groupby('Month')[target].sum()
-    ax.plot(monthly_revenue_10_months.index, monthly_revenue_10_months, label='Actual Revenue', color='blue')
-    ax.plot([11, 12], predicted_revenue, label='Predicted Revenue', color='red', marker='o')
-    ax.set_title('Revenue Prediction for Months 11 and 12')
+@traced
+def revenue_prediction(data, ax, horizon=2, prediction=None):
+    #prediction: forecast_revenue's result, fitted before the plot is drawn
+    if prediction is None:
+        prediction = forecast_revenue(data, horizon)
+    actual_revenue, forecast, title = prediction
+    ax.plot(actual_revenue.index, actual_revenue.values, label='Actual Revenue', color='blue')
+    ax.plot(forecast.index, forecast.values, label='Predicted Revenue', color='red', marker='o')
+    ax.set_title(title)
     ax.set_xlabel('Month')
     ax.set_ylabel('Revenue')
     ax.legend()
-    #====================================
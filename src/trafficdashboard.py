@@ -1,36 +1,37 @@
+import glob
+import hashlib
+import os
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox
+from datacache import CACHE_DIR, file_digest, pa, read_arrow, read_excel_cached, write_arrow
+from analyticsstore import save_to_store
+from dtypeprofiles import apply_profile
+from taskrunner import run_task
+from instrumentation import traced
 
 # File Paths
 TRAFFIC_FILE = 'traffic.xlsx'
 ITEM_CATALOG_FILE = 'items_catalog.xlsx'
 CLEANED_PRODUCT_COUNTS = 'cleaned_product_counts.csv'
+SUMMARY_COLUMNS = ['total_purchasers', 'items_purchased', 'items_added_to_cart', 'items_viewed', 'item_revenue']
 
-# Load Data
-try:
-    traffic_df = pd.read_excel(TRAFFIC_FILE)
-    items_catalog_df = pd.read_excel(ITEM_CATALOG_FILE)
-    product_counts_df = pd.read_csv(CLEANED_PRODUCT_COUNTS)
-except Exception as e:
-    print(f"Error loading files: {e}")
-    exit()
+@traced
+def load_product_counts():
+    # lead counts written by leadanalysis
+    return pd.read_csv(CLEANED_PRODUCT_COUNTS)
 
-
-traffic_df.columns = traffic_df.columns.str.strip().str.lower().str.replace(' ', '_')
-items_catalog_df.columns = items_catalog_df.columns.str.strip().str.lower().str.replace(' ', '_')
-product_counts_df.columns = product_counts_df.columns.str.strip().str.lower().str.replace(' ', '_')
+def normalize_columns(df):
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    return df
 
 
 def clean_product_names(products):
     return products.str.replace(r'[\(\),:]', '', regex=True).str.strip()
 
-traffic_df['item_name'] = clean_product_names(traffic_df['item_name'])
-items_catalog_df['item_number'] = clean_product_names(items_catalog_df['item_number'])
-product_counts_df['product_id'] = clean_product_names(product_counts_df['product_id'])
-
 
-def prepare_data():
+@traced
+def prepare_data(traffic_df, items_catalog_df, product_counts_df):
 
     traffic_items = traffic_df.merge(items_catalog_df, how='inner', left_on='item_name', right_on='item_number')
     full_data = traffic_items.merge(product_counts_df, how='inner', left_on='item_name', right_on='product_id')
@@ -38,6 +39,7 @@ def prepare_data():
     return full_data
 
 
+@traced
 def filter_valid_products(full_data):
     valid_products = full_data[(full_data['total_purchasers'] > 0) |
                                (full_data['items_purchased'] > 0) |
@@ -46,10 +48,96 @@ def filter_valid_products(full_data):
     return valid_products['item_name'].unique()
 
 
-full_data = prepare_data()
-product_list = filter_valid_products(full_data)
-
-def create_dashboard():
+@traced
+def summarize_products(full_data):
+    # one row per product: metric totals plus its position in the dropdown list (-1 if not listed)
+    product_list = filter_valid_products(full_data)
+    summary = full_data.groupby('item_name', sort=False)[SUMMARY_COLUMNS].sum()
+    positions = pd.Series(range(len(product_list)), index=product_list)
+    summary['list_position'] = positions.reindex(summary.index).fillna(-1).astype(int).to_numpy()
+    return summary
+
+
+def read_traffic_workbook():
+    # parsed like trafficanalysis.load_data, so both loaders store the same month keys
+    traffic_df = read_excel_cached(TRAFFIC_FILE)
+    traffic_df['Mon-Year'] = pd.to_datetime(traffic_df['Mon-Year'], format='%b-%Y')
+    return apply_profile(traffic_df, 'traffic')
+
+
+@traced
+def read_inputs():
+    # the current workbooks. they are also kept in the analytics store under their file name,
+    # where a changed workbook replaces the rows of its previous version
+    traffic_df = read_traffic_workbook()
+    items_catalog_df = apply_profile(read_excel_cached(ITEM_CATALOG_FILE), 'items_catalog')
+    save_to_store('traffic', traffic_df, source_path=TRAFFIC_FILE)
+    save_to_store('items_catalog', items_catalog_df, source_path=ITEM_CATALOG_FILE)
+    return normalize_columns(traffic_df), normalize_columns(items_catalog_df)
+
+
+def input_signature():
+    # content digests of the three input files, any edit to one of them changes the signature
+    digest = hashlib.sha1()
+    for path in (TRAFFIC_FILE, ITEM_CATALOG_FILE, CLEANED_PRODUCT_COUNTS):
+        digest.update(file_digest(path).encode('utf-8'))
+    return digest.hexdigest()
+
+
+@traced
+def load_product_summary():
+    # merged per-product totals of the current workbooks are persisted, keyed by the content of all three inputs
+    summary_path = os.path.join(CACHE_DIR, f"traffic_summary_{input_signature()}.arrow")
+    if pa is not None and os.path.exists(summary_path):
+        return read_arrow(summary_path).set_index('item_name')
+
+    traffic_df, items_catalog_df = read_inputs()
+    product_counts_df = normalize_columns(load_product_counts())
+
+    traffic_df['item_name'] = clean_product_names(traffic_df['item_name'])
+    items_catalog_df['item_number'] = clean_product_names(items_catalog_df['item_number'])
+    product_counts_df['product_id'] = clean_product_names(product_counts_df['product_id'])
+
+    summary = summarize_products(prepare_data(traffic_df, items_catalog_df, product_counts_df))
+    if pa is not None:
+        for stale_path in glob.glob(os.path.join(CACHE_DIR, 'traffic_summary_*.arrow')):
+            os.remove(stale_path)
+        write_arrow(summary.reset_index(), summary_path)
+    return summary
+
+
+@traced
+def load_dashboard_data():
+    # Load Data, only when a dashboard is opened. Every open re-checks the inputs, an
+    # unchanged input set is read back from the cached summary
+    summary = load_product_summary()
+    listed = summary[summary['list_position'] >= 0].sort_values('list_position')
+    product_list = listed.index.to_numpy()
+    product_lookup = summary[SUMMARY_COLUMNS].to_dict('index')
+    return product_lookup, product_list
+
+
+def create_dashboard(parent=None):
+    # from main.py the dashboard opens in a Toplevel once the data is loaded off the UI thread
+    if parent is None:
+        root = tk.Tk()
+        run_task(root, load_dashboard_data, on_done=lambda data: build_dashboard(root, *data),
+                 on_error=lambda e: show_load_error(root, e), title="Loading traffic data...")
+        root.mainloop()
+        return
+
+    run_task(parent, load_dashboard_data, on_done=lambda data: build_dashboard(tk.Toplevel(parent), *data),
+             on_error=lambda e: show_load_error(None, e), title="Loading traffic data...")
+
+
+def show_load_error(window, e):
+    messagebox.showerror("Error", f"Error loading files: {e}")
+    if window is not None:
+        window.destroy()
+
+
+def build_dashboard(root, product_lookup, product_list):
+    @traced
     def update_dashboard():
      
         selected_product = product_dropdown.get()
@@ -57,16 +145,16 @@ def create_dashboard():
             messagebox.showerror("Error", "Please select a product")
             return
 
-        filtered_data = full_data[full_data['item_name'] == selected_product]
-        if filtered_data.empty:
+        product = product_lookup.get(selected_product)
+        if product is None:
             messagebox.showinfo("No Data", "No data available for the selected product")
             return
 
-        total_purchasers = filtered_data['total_purchasers'].sum()
-        items_purchased = filtered_data['items_purchased'].sum()
-        items_added_cart = filtered_data['items_added_to_cart'].sum()
-        items_viewed = filtered_data['items_viewed'].sum()
-        item_revenue = filtered_data['item_revenue'].sum()
+        total_purchasers = product['total_purchasers']
+        items_purchased = product['items_purchased']
+        items_added_cart = product['items_added_to_cart']
+        items_viewed = product['items_viewed']
+        item_revenue = product['item_revenue']
         total_purchasers_label.config(text=f"Total Purchasers: {total_purchasers}")
         items_purchased_label.config(text=f"Items Purchased: {items_purchased}")
         items_added_cart_label.config(text=f"Items Added to Cart: {items_added_cart}")
@@ -74,7 +162,6 @@ def create_dashboard():
         item_revenue_label.config(text=f"Item Revenue: {item_revenue:.2f}")
 
 
-    root = tk.Tk()
     root.title("Traffic Analysis Dashboard")
     root.geometry("800x600")
 
@@ -101,7 +188,5 @@ def create_dashboard():
     item_revenue_label = ttk.Label(root, text="Item Revenue: -")
     item_revenue_label.grid(row=5, column=0, padx=10, pady=10, sticky='w')
 
-    root.mainloop()
-
 if __name__ == "__main__":
     create_dashboard()
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+import tkinter as tk
+from tkinter import ttk
+from ranking import stable_order, top_k
+
+# Virtualized table for large ranked results. TableModel keeps a result as one NumPy array per
+# column plus a cached stable ranking for each (column, direction), so sorting is computed once
+# per column and paging is an index slice. A new sort only ranks the first RANKED_ROWS rows with
+# top_k, the full sort runs once a window goes past them. VirtualTable reuses a fixed set of
+# Treeview rows and only formats the visible window, so scrolling, paging and re-sorting cost
+# the same for 10 rows or 1M.
+
+RANKED_ROWS = 1000
+
+
+class TableModel:
+    def __init__(self, columns, formatters=None):
+        # columns: {name: array}, all the same length. formatters: {name: value -> str}
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.names = list(self.columns)
+        self.formatters = formatters or {}
+        self.n_rows = len(next(iter(self.columns.values()))) if self.columns else 0
+        self.orders = {}
+        self.sorted_by = None
+        self.order = np.arange(self.n_rows)
+
+    @classmethod
+    def from_frame(cls, df, index_label=None, formatters=None):
+        # the index becomes the first column (e.g. the query or page level the rows were grouped by)
+        columns = {}
+        if index_label is not None:
+            columns[index_label] = df.index.to_numpy(dtype=object)
+        for col in df.columns:
+            columns[col] = df[col].to_numpy()
+        return cls(columns, formatters)
+
+    def sort_key(self, name):
+        # numbers sort as they are, anything else by its position in the sorted uniques. missing
+        # values become NaN, which both stable sorts below place last
+        values = self.columns[name]
+        if np.issubdtype(values.dtype, np.number) or values.dtype == bool:
+            return values.astype(np.float64)
+        codes, _ = pd.factorize(values, sort=True)
+        return np.where(codes >= 0, codes, np.nan)
+
+    def sorted_order(self, name, descending=False, rows=RANKED_ROWS):
+        # at least the first `rows` positions of the ranking. stable, so ties keep the row order
+        # of the result in both directions
+        order = self.orders.get((name, descending))
+        if order is None or len(order) < min(rows, self.n_rows):
+            key = self.sort_key(name)
+            if rows <= RANKED_ROWS:
+                order = top_k(key, RANKED_ROWS, descending)
+            else:
+                order = stable_order(key, descending)
+            self.orders[(name, descending)] = order
+        return order
+
+    def sort(self, name, descending=False):
+        self.sorted_by = (name, descending)
+        self.order = self.sorted_order(name, descending)
+
+    def window(self, start, count):
+        # formatted rows [start, start + count) in the current order
+        if self.sorted_by and start + count > len(self.order) and len(self.order) < self.n_rows:
+            self.order = self.sorted_order(*self.sorted_by, rows=start + count)
+        rows = self.order[start:start + count]
+        cells = []
+        for name in self.names:
+            values = self.columns[name][rows]
+            fmt = self.formatters.get(name, str)
+            cells.append([fmt(value) for value in values])
+        return list(zip(*cells))
+
+
+class VirtualTable(ttk.Frame):
+    def __init__(self, parent, columns, headings=None, height=15, sort_column=None, descending=False, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.column_names = list(columns)
+        self.headings = headings or {}
+        self.height = height
+        self.model = TableModel({name: np.array([], dtype=object) for name in self.column_names})
+        self.offset = 0
+        self.sort_column = sort_column
+        self.descending = descending
+
+        self.tree = ttk.Treeview(self, columns=self.column_names, show="headings", height=height, selectmode="browse")
+        for name in self.column_names:
+            self.tree.heading(name, command=lambda name=name: self.toggle_sort(name))
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.status = ttk.Label(self, anchor=tk.E)
+
+        self.status.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # the tree never scrolls itself, every scroll input moves the model window instead
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_wheel)
+        for sequence, step in (('<Prior>', -height), ('<Next>', height), ('<Home>', None), ('<End>', None)):
+            self.tree.bind(sequence, lambda event, step=step, sequence=sequence: self.on_key(sequence, step))
+        self.item_ids = [self.tree.insert("", tk.END, values=()) for _ in range(height)]
+        self.update_headings()
+
+    def set_model(self, model):
+        # a new result keeps the current sort, scrolling restarts at the top
+        self.model = model
+        if self.sort_column in model.columns:
+            model.sort(self.sort_column, self.descending)
+        self.offset = 0
+        self.update_headings()
+        self.render()
+
+    def toggle_sort(self, name):
+        # first click sorts descending (largest clicks first), the next click flips the direction
+        self.descending = not self.descending if name == self.sort_column else True
+        self.sort_column = name
+        self.model.sort(name, self.descending)
+        self.offset = 0
+        self.update_headings()
+        self.render()
+
+    def update_headings(self):
+        for name in self.column_names:
+            text = self.headings.get(name, name)
+            if name == self.sort_column:
+                text += " ▼" if self.descending else " ▲"
+            self.tree.heading(name, text=text)
+
+    def max_offset(self):
+        return max(self.model.n_rows - self.height, 0)
+
+    def scroll_to(self, offset):
+        offset = min(max(int(offset), 0), self.max_offset())
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def yview(self, *args):
+        # scrollbar protocol: ('moveto', fraction) or ('scroll', n, 'units' | 'pages')
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * self.model.n_rows)
+        elif args[0] == 'scroll':
+            step = self.height if args[2] == 'pages' else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def on_key(self, sequence, step):
+        if sequence == '<Home>':
+            self.scroll_to(0)
+        elif sequence == '<End>':
+            self.scroll_to(self.max_offset())
+        else:
+            self.scroll_to(self.offset + step)
+        return "break"
+
+    def render(self):
+        rows = self.model.window(self.offset, self.height)
+        for position, item in enumerate(self.item_ids):
+            self.tree.item(item, values=rows[position] if position < len(rows) else ())
+
+        n_rows = self.model.n_rows
+        if n_rows:
+            self.scrollbar.set(self.offset / n_rows, min((self.offset + self.height) / n_rows, 1.0))
+            self.status.config(text=f"Rows {self.offset + 1:,}-{self.offset + len(rows):,} of {n_rows:,}")
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            self.status.config(text="No rows")
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from benchmarks import make_seo_key_frame, suite_frames
+from data_correlation import AdvancedDataAnalyzer, build_composite_keys
+
+SOURCES = {"SEO Queries": 'seo_queries', "Traffic Data": 'traffic', "Leads Data": 'leads',
+           "SEO Pages": 'seo_pages', "Items Catalog": 'items_catalog'}
+
+
+@pytest.mark.parametrize('engine', ['concat', 'hash'])
+def test_key_engines_match_rowwise(engine):
+    frame = make_seo_key_frame(5_000)
+    rowwise = build_composite_keys(frame, 'rowwise')
+    if engine == 'hash':
+        rowwise = pd.util.hash_pandas_object(rowwise, index=False)
+    assert build_composite_keys(frame, engine).equals(rowwise)
+
+
+def test_catalog_joins_on_item_number():
+    # catalog-shaped fixture: catalog rows are keyed by item number, traffic names items by number
+    analyzer = AdvancedDataAnalyzer()
+    analyzer.data_sources["Items Catalog"] = pd.DataFrame({
+        'item_number': ['M100', 'M101', 'M102', 'M103'],
+        'item_product_group': ['Cables', 'Cables', 'Adapters', 'Adapters'],
+        'item_description': ['usb cable 1m', 'usb cable 2m', 'hdmi adapter', 'vga adapter'],
+    })
+    analyzer.data_sources["Traffic Data"] = pd.DataFrame({
+        'Item name': ['M100', 'm101 ', 'M101', 'Z999'],
+        'Items viewed': [10, 5, 7, 1],
+    })
+    analyzer.data_sources["Leads Data"] = pd.DataFrame({
+        'Products Requested': ['Product: M102', 'usb cable 1m'],
+    })
+    analyzer.prepare_correlations()
+    catalog_traffic = analyzer.cross_source_join.summary().set_index(['left', 'right']).loc[("Items Catalog", "Traffic Data")]
+    assert catalog_traffic['shared_keys'] == 2
+    assert catalog_traffic['matched_rows_right'] == 3
+    assert analyzer.cross_source_join.key_columns["Traffic Data"] == 'description_key'
+
+
+def test_profiled_sources_keep_composite_keys():
+    # the composite keys read the same whether or not the dtype profile was applied at load
+    frames = suite_frames(5_000, seed=0)
+    raw, profiled = AdvancedDataAnalyzer(), AdvancedDataAnalyzer()
+    for source_name, key in SOURCES.items():
+        raw.data_sources[source_name] = frames[key].copy()
+        profiled.data_sources[source_name] = profiled.profile_source(source_name, frames[key].copy())
+    for source_name in SOURCES:
+        expected = raw.create_composite_key(source_name).get('composite_key')
+        actual = profiled.create_composite_key(source_name).get('composite_key')
+        assert (expected is None) == (actual is None), source_name
+        if expected is not None:
+            assert expected.equals(actual), f"{source_name}: e.g. {actual[expected != actual].iloc[0]}"
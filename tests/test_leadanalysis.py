@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import make_lead_requests
+from leadanalysis import extract_product_id, extract_product_ids, iter_product_ids
+
+
+def expected_ids(requests):
+    # extract_product_id row by row, None for cells that are not text
+    return requests.map(lambda value: extract_product_id(value) if isinstance(value, str) else None)
+
+
+def assert_same_ids(result, expected):
+    assert list(result.index) == list(expected.index)
+    mismatches = expected.fillna('<None>') != result.fillna('<None>')
+    assert not mismatches.any(), f"{mismatches.sum()} rows differ, e.g. {expected[mismatches].index[0]}"
+
+
+@pytest.mark.parametrize('dtype', [object, 'category'])
+def test_extract_product_ids_matches_rowwise(dtype):
+    requests = make_lead_requests(50_000, seed=1).astype(dtype)
+    assert_same_ids(extract_product_ids(requests), requests.astype(object).apply(extract_product_id))
+
+
+def test_extract_product_ids_edge_cases():
+    requests = pd.Series([
+        np.nan, 5, None, '', '   ', ' "M1" quoted', 'Product: "A1', '　m1 wide space',
+        'x Product:Z9', 'ITEM NUMBER:ab_1', '!! no word', 'Déjà M2', 'product:   ',
+    ], index=range(100, 113), name='Products Requested')
+    result = extract_product_ids(requests)
+    assert_same_ids(result, expected_ids(requests))
+    assert result.name == 'Products Requested'
+
+
+def test_iter_product_ids_matches_one_pass():
+    requests = make_lead_requests(10_000, seed=2)
+    streamed = pd.concat(list(iter_product_ids(requests, chunk_size=1_234)))
+    assert_same_ids(streamed, requests.apply(extract_product_id))
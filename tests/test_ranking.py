@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ranking import TopK, stable_order, top_k, top_rows
+from virtualtable import TableModel
+
+
+@pytest.fixture
+def tied_values():
+    # few distinct values so most of the ranking is decided by ties, plus missing values
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, 50_000).astype(np.float64)
+    values[rng.random(len(values)) < 0.01] = np.nan
+    return values
+
+
+@pytest.mark.parametrize('descending', [True, False])
+@pytest.mark.parametrize('k', [0, 1, 10, 7_000, 49_600, 60_000])
+def test_top_k_is_prefix_of_stable_order(tied_values, k, descending):
+    assert np.array_equal(top_k(tied_values, k, descending), stable_order(tied_values, descending)[:k])
+
+
+def test_top_rows_matches_nlargest_and_stable_sort():
+    rng = np.random.default_rng(1)
+    counts = pd.DataFrame({'Product ID': [f"P{i}" for i in range(50_000)], 'Count': rng.integers(0, 50, 50_000)})
+    assert top_rows(counts, 'Count', 10).equals(counts.nlargest(10, 'Count'))
+    assert top_rows(counts, 'Count', 10).equals(counts.sort_values('Count', ascending=False, kind='stable').head(10))
+    assert top_rows(counts, 'Count', 10, ascending=True).equals(counts.nsmallest(10, 'Count'))
+
+
+def test_running_top_k_matches_full_recount():
+    # repeated ids across chunks, then one decrease, which falls back to ranking every key
+    rng = np.random.default_rng(2)
+    requests = pd.DataFrame({'Product ID': [f"P{i}" for i in rng.integers(0, 5_000, 60_000)],
+                             'Count': rng.integers(1, 5, 60_000)})
+    running = TopK(10)
+    for start in range(0, len(requests), 20_000):
+        chunk = requests.iloc[start:start + 20_000]
+        running.update(chunk.groupby('Product ID', sort=False)['Count'].sum().to_dict())
+    expected = requests.groupby('Product ID', sort=False)['Count'].sum()
+    assert [key for key, _ in running.items()] == list(expected.sort_values(ascending=False, kind='stable').index[:10])
+
+    leader = running.items()[0][0]
+    running.update({leader: -1_000})
+    expected[leader] -= 1_000
+    assert running.items() == list(expected.sort_values(ascending=False, kind='stable').head(10).items())
+
+
+def test_table_model_pages_past_ranked_rows(tied_values):
+    model = TableModel({'Count': tied_values})
+    model.sort('Count', descending=True)
+    expected = tied_values[stable_order(tied_values)[990:1010]]
+    assert np.array_equal([float(row[0]) for row in model.window(990, 20)], expected, equal_nan=True)
+
+
+def test_table_model_sort_matches_sort_values():
+    rng = np.random.default_rng(3)
+    top_queries = pd.DataFrame(
+        {'Clicks': rng.integers(0, 30, 5_000), 'CTR': rng.random(5_000)},
+        index=pd.Index([f"query {i % 700}" for i in range(5_000)], name='Top queries'),
+    )
+    model = TableModel.from_frame(top_queries, 'Top Queries')
+    for column in ('Clicks', 'CTR', 'Top Queries'):
+        for descending in (True, False):
+            model.sort(column, descending)
+            frame = top_queries.reset_index().rename(columns={'Top queries': 'Top Queries'})
+            expected = frame.sort_values(column, ascending=not descending, kind='stable').head(15)
+            assert [row[0] for row in model.window(0, 15)] == list(expected['Top Queries'])